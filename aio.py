@@ -0,0 +1,35 @@
+import asyncio
+import concurrent.futures
+import connections
+import ratelimit
+
+# not more workers than pooled connections per client, so every call reuses a connection
+__executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=connections.POOL_SIZE,
+    thread_name_prefix="dcli-api")
+
+
+async def call(func, *args, **kwargs):
+    """run a blocking docker sdk call in the bounded executor, for the active endpoint and priority"""
+    loop = asyncio.get_running_loop()
+    name = connections.get_active()
+    background = ratelimit.is_background()
+
+    def go():
+        with connections.using(name), ratelimit.background(background):
+            return func(*args, **kwargs)
+
+    return await loop.run_in_executor(__executor, go)
+
+
+def gather(*funcs):
+    """
+    run independent blocking calls concurrently and get their results in order
+
+    must not be called from within one of the calls, as they share
+    the bounded executor
+    """
+    async def go():
+        return await asyncio.gather(*(call(func) for func in funcs))
+
+    return asyncio.run(go())
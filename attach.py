@@ -0,0 +1,75 @@
+import os
+import select
+import shutil
+import signal
+import sys
+import terminal
+
+# bash if the image has it, sh otherwise
+SHELL = ["/bin/sh", "-c", "command -v bash >/dev/null && exec bash || exec sh"]
+
+
+def exec_session(api, container_id, command=None):
+    """
+    run a command attached to the terminal, a shell if none is given
+
+    one exec process lives for the whole session, the keys are passed
+    through in raw mode and its output is written as it arrives; the
+    tty is resized with the terminal; returns the exit code
+    """
+    exec_id = api.exec_create(
+        container_id,
+        command or SHELL,
+        stdin=True,
+        tty=True,
+        environment={"TERM": os.getenv("TERM", "xterm")})["Id"]
+
+    sock = api.exec_start(exec_id, tty=True, socket=True)
+    # the sdk returns a SocketIO for tcp endpoints, select and recv need the socket
+    sock = getattr(sock, "_sock", sock)
+
+    resized = [True]
+    previous_handler = signal.signal(signal.SIGWINCH, lambda *_: resized.__setitem__(0, True))
+
+    try:
+        with terminal.raw_mode(raw=True) as fd:
+            while True:
+                if resized[0]:
+                    resized[0] = False
+                    __resize(api, exec_id)
+
+                readable, _, _ = select.select([sock, fd], [], [], 0.2)
+
+                if sock in readable and not __copy_output(sock):
+                    break
+                if fd in readable:
+                    sock.sendall(os.read(fd, 4096))
+    finally:
+        signal.signal(signal.SIGWINCH, previous_handler)
+        sock.close()
+
+    return api.exec_inspect(exec_id).get("ExitCode")
+
+
+def __copy_output(sock):
+    """copy the available output to stdout, False at the end of the stream"""
+    data = sock.recv(65536)
+    if not data:
+        return False
+
+    # tls sockets may hold decrypted data select does not see
+    while getattr(sock, "pending", lambda: 0)():
+        data += sock.recv(sock.pending())
+
+    os.write(sys.stdout.fileno(), data)
+    return True
+
+
+def __resize(api, exec_id):
+    size = shutil.get_terminal_size()
+
+    try:
+        api.exec_resize(exec_id, height=size.lines, width=size.columns)
+    except Exception:
+        # the process may not have started yet or already ended
+        pass
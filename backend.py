@@ -0,0 +1,308 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+from rich.console import Console
+import connections
+import ratelimit
+
+console = Console()
+
+# views the backend publishes: key identifying a row and key the rows are sorted by
+VIEWS = {
+    "service ls": ("id", "name"),
+    "node ls": ("id", "host"),
+    "node overview": ("node", "node"),
+}
+
+
+def get_socket_path():
+    """get the socket of the backend for the active endpoint, set by DCLI_BACKEND_SOCKET"""
+    path = os.getenv("DCLI_BACKEND_SOCKET")
+    if path:
+        return path
+
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or f"/tmp/dcli-{os.getuid()}"
+    return os.path.join(runtime_dir, "dcli", f"{connections.get_endpoint_key()}.sock")
+
+
+def get_private_dirs(path):
+    """
+    get the directories of a default socket path that only the user may
+    own and access, from the outermost; none for DCLI_BACKEND_SOCKET
+    """
+    if os.getenv("DCLI_BACKEND_SOCKET"):
+        return []
+
+    directory = os.path.dirname(path)
+
+    # without XDG_RUNTIME_DIR, /tmp/dcli-<uid> could have been created by anyone
+    if not os.getenv("XDG_RUNTIME_DIR"):
+        return [os.path.dirname(directory), directory]
+
+    return [directory]
+
+
+def check_private_dir(directory):
+    """refuse a directory not owned by the user or accessible by others, another user could spoof the backend"""
+    info = os.lstat(directory)
+
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o700:
+        raise PermissionError(f"{directory} must be a directory owned by you with mode 0700")
+
+
+class Publisher:
+    """
+    Sends the rows of the views to the subscribed clients
+
+    a new subscriber gets all rows of its views, afterwards only the
+    changed and removed rows of each poll are sent
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {view: {} for view in VIEWS}
+        self.subscribers = []
+        self.error = None
+
+    def subscribe(self, views):
+        """register a subscriber, get the queue of its messages"""
+        messages = queue.Queue()
+
+        with self.lock:
+            for view in views:
+                messages.put({"view": view, "rows": list(self.views[view].values())})
+
+            messages.put({"error": self.error})
+            self.subscribers.append((views, messages))
+
+        return messages
+
+    def unsubscribe(self, messages):
+        """remove a subscriber"""
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s[1] is not messages]
+
+    def publish(self, view, rows):
+        """replace the rows of a view, the changes are sent to its subscribers"""
+        key = VIEWS[view][0]
+        rows = {row[key]: row for row in json.loads(json.dumps(rows, default=str))}
+
+        with self.lock:
+            old = self.views[view]
+            upsert = [row for row_key, row in rows.items() if old.get(row_key) != row]
+            remove = [row_key for row_key in old if row_key not in rows]
+            self.views[view] = rows
+
+            if upsert or remove:
+                self.__send(view, {"view": view, "upsert": upsert, "remove": remove})
+
+    def publish_error(self, error):
+        """send the error of the last poll, None if it succeeded"""
+        with self.lock:
+            if error != self.error:
+                self.error = error
+                self.__send(None, {"error": error})
+
+    def __send(self, view, message):
+        for views, messages in self.subscribers:
+            if view is None or view in views:
+                messages.put(message)
+
+
+def serve(interval=2.0, stats_interval=30.0):
+    """
+    run the backend for the active endpoint until interrupted
+
+    it polls the swarm every interval seconds and immediately after
+    docker events, collects the node stats via ssh every
+    stats_interval seconds and publishes the rows to the clients
+    """
+    # imported here, as the views import this module for the client
+    import exporter
+    import node
+
+    state = exporter.State()
+    publisher = Publisher()
+    changed = threading.Event()
+
+    def poll():
+        state.poll()
+        publisher.publish_error(state.error)
+
+        if state.error is None:
+            publisher.publish("service ls", state.services)
+            publisher.publish("node ls", state.nodes)
+            publisher.publish("node overview", state.overview)
+
+    def run_poller():
+        with ratelimit.background():
+            while True:
+                # bursts of events are handled by one poll
+                if changed.wait(interval):
+                    time.sleep(0.5)
+
+                changed.clear()
+                poll()
+
+    def run_stats():
+        while True:
+            node.load_stats(state.stats)
+            changed.set()
+            time.sleep(stats_interval)
+
+    poll()
+    threading.Thread(target=run_poller, daemon=True).start()
+    threading.Thread(target=__run_events, args=(changed,), daemon=True).start()
+    if stats_interval:
+        threading.Thread(target=run_stats, daemon=True).start()
+
+    class Handler(socketserver.StreamRequestHandler):
+        """Streams the messages of one client as json lines"""
+
+        def handle(self):
+            request = json.loads(self.rfile.readline() or "{}")
+            views = [v for v in request.get("subscribe", []) if v in VIEWS]
+            messages = publisher.subscribe(views)
+
+            try:
+                while True:
+                    self.wfile.write(json.dumps(messages.get()).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+            except OSError:
+                pass
+            finally:
+                publisher.unsubscribe(messages)
+
+    path = get_socket_path()
+    for directory in get_private_dirs(path):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        check_private_dir(directory)
+
+    if os.path.exists(path):
+        os.unlink(path)
+
+    # the socket is created accessible by the user only, there is no moment others could connect
+    umask = os.umask(0o077)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    finally:
+        os.umask(umask)
+
+    server.daemon_threads = True
+
+    console.print(f"backend for [orange3]{connections.get_endpoint()}[/] listening on [orange3]{path}[/]")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+def __run_events(changed):
+    """set changed for every docker event, reconnecting if the stream ends"""
+    while True:
+        try:
+            for _ in connections.client.events(decode=True, filters={"type": ["service", "node", "container"]}):
+                changed.set()
+        except Exception:
+            pass
+
+        time.sleep(5)
+
+
+class BackendClient:
+    """
+    Thin client keeping the rows of views up to date from a backend
+
+    the rows are received in the background, get_rows returns the
+    latest ones without any request
+    """
+
+    def __init__(self, path, views):
+        self.lock = threading.Lock()
+        self.views = {view: None for view in views}
+        self.error = None
+        self.received = threading.Condition(self.lock)
+
+        for directory in get_private_dirs(path):
+            check_private_dir(directory)
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.sock.sendall(json.dumps({"subscribe": views}).encode("utf-8") + b"\n")
+
+        threading.Thread(target=self.__run, daemon=True).start()
+
+    def get_rows(self, view, timeout=5):
+        """get the rows of a view, waits for the first ones"""
+        with self.lock:
+            if not self.received.wait_for(lambda: self.views[view] is not None or self.error, timeout):
+                raise Exception("no answer from the dcli backend")
+            if self.error:
+                raise Exception(f"backend: {self.error}")
+
+            sort_key = VIEWS[view][1]
+            return sorted(self.views[view].values(), key=lambda r: r.get(sort_key) or "")
+
+    def __run(self):
+        try:
+            with self.sock.makefile("rb") as lines:
+                for line in lines:
+                    self.__apply(json.loads(line))
+        except (OSError, ValueError):
+            pass
+
+        with self.lock:
+            self.error = "connection to the dcli backend lost"
+            self.received.notify_all()
+
+    def __apply(self, message):
+        with self.lock:
+            if "error" in message:
+                self.error = message["error"]
+            elif "rows" in message:
+                key = VIEWS[message["view"]][0]
+                self.views[message["view"]] = {row[key]: row for row in message["rows"]}
+            else:
+                rows = self.views[message["view"]]
+                rows.update((row[VIEWS[message["view"]][0]], row) for row in message["upsert"])
+                for row_key in message["remove"]:
+                    rows.pop(row_key, None)
+
+            self.received.notify_all()
+
+
+__clients = {}
+
+
+def get_loader(view):
+    """
+    get a function returning the rows of a view from the backend
+
+    None if no backend runs for the active endpoint or it is disabled
+    with DCLI_BACKEND=0; the views load the rows themselves then
+    """
+    if os.getenv("DCLI_BACKEND") == "0" or connections.get_endpoint().startswith("snapshot://"):
+        return None
+
+    path = get_socket_path()
+    backend_client = __clients.get(path)
+
+    if backend_client is None or backend_client.error:
+        if not os.path.exists(path):
+            return None
+
+        try:
+            backend_client = __clients[path] = BackendClient(path, list(VIEWS))
+        except OSError:
+            return None
+
+    return lambda: backend_client.get_rows(view)
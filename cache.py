@@ -0,0 +1,54 @@
+import json
+import os
+import time
+import connections
+import utils
+
+
+def load(view):
+    """get the cached rows of a view and the time they were saved, None if nothing is cached"""
+    path = __get_path(view)
+    if not path:
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    # a file of an older version or otherwise unexpected shape is a miss
+    if not isinstance(entry, dict) or not isinstance(entry.get("rows"), list) \
+            or not isinstance(entry.get("saved_at"), (int, float)):
+        return None
+
+    return entry["rows"], entry["saved_at"]
+
+
+def save(view, rows):
+    """save the rows of a view for the active endpoint"""
+    path = __get_path(view)
+    if not path:
+        return
+
+    data = json.dumps({"saved_at": time.time(), "rows": rows}, default=str)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        utils.write_atomic(path, data.encode("utf-8"))
+    except OSError:
+        pass
+
+
+def __get_path(view):
+    """get the cache file of a view, one per endpoint; None for snapshots"""
+    endpoint = connections.get_endpoint()
+
+    # checked by url, so no client is created before the view is shown
+    if endpoint.startswith("snapshot://"):
+        return None
+
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    view = view.replace(" ", "-")
+
+    return os.path.join(cache_home, "dcli", f"{connections.get_endpoint_key()}-{view}.json")
@@ -0,0 +1,281 @@
+from collections import Counter, defaultdict
+from rich.console import Console
+from table_view import TableView
+from records import Resources
+import aio
+import records
+import utils
+
+NANO_CPUS = 1_000_000_000
+
+
+class Capacity:
+    """
+    Reservations and limits of the running tasks per node
+
+    the sums are kept between updates, only the tasks started, stopped
+    or changed since the last update are added or subtracted; so a
+    refresh is one pass over the tasks, live while services are scaled
+
+    like the swarm scheduler only the reservations count for the free
+    resources of a node, placement constraints are not taken into account
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.services = {}
+        self.tasks = {}
+        self.reserved = defaultdict(Resources)
+        self.limited = defaultdict(Resources)
+        self.running = Counter()
+
+    def load(self):
+        """load nodes, services and tasks and update the sums"""
+        nodes, services, tasks = aio.gather(
+            records.get_nodes,
+            records.get_services,
+            lambda: records.get_tasks(filters={"desired-state": "running"}))
+
+        self.update(nodes, services, tasks)
+
+    def update(self, nodes, services, tasks):
+        """update the sums with the tasks assigned to a node and meant to run"""
+        self.nodes = {n.id: n for n in nodes}
+        self.services = {s.id: s for s in services}
+        tasks = {t.id: t for t in tasks if t.node_id and t.desired_state == "running"}
+
+        for task_id, task in self.tasks.items():
+            if tasks.get(task_id) != task:
+                self.__apply(task, -1)
+
+        for task_id, task in tasks.items():
+            if self.tasks.get(task_id) != task:
+                self.__apply(task, 1)
+
+        self.tasks = tasks
+
+    def get_free(self, node):
+        """get the resources of a node not reserved by its tasks"""
+        return node.resources - self.reserved[node.id]
+
+    def get_free_nodes(self):
+        """get the free resources of the nodes tasks can be placed on, by node id"""
+        return {
+            node.id: self.get_free(node)
+            for node in self.nodes.values()
+            if node.availability == "active" and node.state == "ready"}
+
+    def get_fitting_replicas(self, reservations: Resources, free=None):
+        """
+        get the number of replicas with the reservations fitting on the nodes,
+        None if unlimited; free is the result of get_free_nodes by default
+        """
+        if not reservations:
+            return None
+
+        free = self.get_free_nodes() if free is None else free
+
+        return sum(self.__get_fitting(node_free, reservations) for node_free in free.values())
+
+    def reserve(self, free, reservations: Resources, replicas):
+        """subtract the reservations of replicas from the free resources of get_free_nodes, filling node by node"""
+        for node_id, node_free in free.items():
+            if replicas <= 0:
+                break
+
+            count = min(self.__get_fitting(node_free, reservations), replicas)
+            free[node_id] = node_free - reservations * count
+            replicas -= count
+
+    def get_node_rows(self):
+        """get the capacity rows of the nodes, one dict per node"""
+        for node in sorted(self.nodes.values(), key=lambda n: n.hostname or ""):
+            reserved = self.reserved[node.id]
+            limited = self.limited[node.id]
+            free = self.get_free(node)
+
+            yield {
+                "node": node.hostname,
+                "availability": node.availability,
+                "state": node.state,
+                "tasks": self.running[node.id],
+                "cpus": node.resources.nano_cpus / NANO_CPUS,
+                "cpus_reserved": reserved.nano_cpus / NANO_CPUS,
+                "cpus_limit": limited.nano_cpus / NANO_CPUS,
+                "cpus_free": free.nano_cpus / NANO_CPUS,
+                "memory": node.resources.memory_bytes,
+                "memory_reserved": reserved.memory_bytes,
+                "memory_limit": limited.memory_bytes,
+                "memory_free": free.memory_bytes}
+
+    def get_service_rows(self):
+        """
+        get the capacity rows of the services, one dict per service
+
+        next_fits tells whether one more replica of a replicated service
+        would fit, None if the service reserves nothing or is global
+        """
+        running = Counter(t.service_id for t in self.tasks.values())
+
+        for service in sorted(self.services.values(), key=lambda s: s.name):
+            fitting = None if service.is_global else self.get_fitting_replicas(service.reservations)
+
+            yield {
+                "service": service.name,
+                "mode": "global" if service.is_global else "replicated",
+                "replicas": service.replicas,
+                "tasks": running[service.id],
+                "cpus_reserved": service.reservations.nano_cpus / NANO_CPUS,
+                "memory_reserved": service.reservations.memory_bytes,
+                "cpus_limit": service.limits.nano_cpus / NANO_CPUS,
+                "memory_limit": service.limits.memory_bytes,
+                "fitting_replicas": fitting,
+                "next_fits": None if fitting is None else fitting > 0}
+
+    @staticmethod
+    def __get_fitting(free, reservations):
+        return int(max(min(
+            free.nano_cpus // reservations.nano_cpus if reservations.nano_cpus else float("inf"),
+            free.memory_bytes // reservations.memory_bytes if reservations.memory_bytes else float("inf")), 0))
+
+    def __apply(self, task, sign):
+        if sign > 0:
+            self.reserved[task.node_id] += task.reservations
+            self.limited[task.node_id] += task.limits
+        else:
+            self.reserved[task.node_id] -= task.reservations
+            self.limited[task.node_id] -= task.limits
+
+        self.running[task.node_id] += sign
+
+
+def get_node_rows():
+    """get the capacity rows of the nodes"""
+    capacity = Capacity()
+    capacity.load()
+
+    return capacity.get_node_rows()
+
+
+def get_service_rows():
+    """get the capacity rows of the services"""
+    capacity = Capacity()
+    capacity.load()
+
+    return capacity.get_service_rows()
+
+
+def check_scale(services, replicas):
+    """
+    get a warning for every service whose replicas won't fit on the nodes
+
+    the services are scaled together, the replicas of each service that
+    fits are taken from the free resources before checking the next one
+    """
+    capacity = Capacity()
+    capacity.load()
+    free = capacity.get_free_nodes()
+
+    for service in services:
+        record = capacity.services.get(service.id)
+        if record is None or record.is_global:
+            continue
+
+        missing = replicas - record.replicas
+        fitting = capacity.get_fitting_replicas(record.reservations, free)
+
+        if missing <= 0 or fitting is None:
+            continue
+
+        if missing > fitting:
+            yield f"only {fitting} more replicas of [orange3]{record.name}[/] fit, {missing} requested"
+        else:
+            capacity.reserve(free, record.reservations, missing)
+
+
+def show_nodes(console: Console):
+    """show the capacity of the nodes, updated live"""
+    capacity = Capacity()
+
+    def load_rows():
+        capacity.load()
+        return capacity.get_node_rows()
+
+    def format_row(row):
+        color = "green" if row["state"] == "ready" and row["availability"] == "active" else "red"
+
+        return [
+            row["node"],
+            f"[{color}]{row['state']}/{row['availability']}[/]",
+            str(row["tasks"]),
+            __format_usage(f"{row['cpus_reserved']:g}", f"{row['cpus']:g}", row["cpus_reserved"], row["cpus"]),
+            f"{row['cpus_limit']:g}",
+            __format_free(f"{row['cpus_free']:g}", row["cpus_free"], row["cpus"]),
+            __format_usage(
+                utils.format_size(row["memory_reserved"]), utils.format_size(row["memory"]),
+                row["memory_reserved"], row["memory"]),
+            utils.format_size(row["memory_limit"]),
+            __format_free(utils.format_size(row["memory_free"]), row["memory_free"], row["memory"])]
+
+    columns = [
+        ("node", "node"),
+        ("state", "state"),
+        ("tasks", "tasks"),
+        ("cpus reserved", "cpus_reserved"),
+        ("cpus limit", "cpus_limit"),
+        ("cpus free", "cpus_free"),
+        ("memory reserved", "memory_reserved"),
+        ("memory limit", "memory_limit"),
+        ("memory free", "memory_free")]
+
+    TableView(console, "node capacity", columns, load_rows, format_row).show()
+
+
+def show_services(console: Console):
+    """show the reservations of the services and whether one more replica fits, updated live"""
+    capacity = Capacity()
+
+    def load_rows():
+        capacity.load()
+        return capacity.get_service_rows()
+
+    def format_row(row):
+        if row["next_fits"] is None:
+            fits = "global" if row["mode"] == "global" else "no reservation"
+        elif row["next_fits"]:
+            fits = f"[green]{row['fitting_replicas']} more[/]"
+        else:
+            fits = "[red]next replica won't fit[/]"
+
+        return [
+            row["service"],
+            f"{row['tasks']}/{row['replicas']}",
+            f"{row['cpus_reserved']:g}",
+            utils.format_size(row["memory_reserved"]),
+            f"{row['cpus_limit']:g}",
+            utils.format_size(row["memory_limit"]),
+            fits]
+
+    columns = [
+        ("service", "service"),
+        ("tasks", "tasks"),
+        ("cpus reserved", "cpus_reserved"),
+        ("memory reserved", "memory_reserved"),
+        ("cpus limit", "cpus_limit"),
+        ("memory limit", "memory_limit"),
+        ("fits", "fitting_replicas")]
+
+    TableView(console, "service capacity", columns, load_rows, format_row).show()
+
+
+def __format_usage(used_text, total_text, used, total):
+    percent = used / total * 100 if total else 0
+    color = "green" if percent < 80 else "orange3" if percent <= 100 else "red"
+
+    return f"{used_text}/{total_text} [{color}]({percent:.0f}%)[/]"
+
+
+def __format_free(text, free, total):
+    color = "red" if free < 0 else "orange3" if total and free / total < 0.2 else "green"
+
+    return f"[{color}]{text}[/]"
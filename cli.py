@@ -0,0 +1,337 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+from rich.console import Console
+from rich.table import Table
+import docker
+import connections
+import snapshot
+
+console = Console()
+
+
+def run(argv, interactive):
+    """
+    run a single command without the interactive menus
+
+    only the module of the selected command is imported; without
+    a command the interactive menus are started
+    """
+    parser = __get_parser()
+    args = parser.parse_args(argv)
+
+    if args.context:
+        connections.switch(args.context)
+
+    if args.snapshot:
+        connections.use(snapshot.SnapshotClient.from_file(args.snapshot))
+
+    if not args.module:
+        interactive()
+        return 0
+
+    if not getattr(args, "handler", None):
+        args.print_help()
+        return 1
+
+    module = importlib.import_module(args.module)
+
+    try:
+        return args.handler(module, args) or 0
+    except Exception as e:
+        console.print(e)
+        return 1
+
+
+def __get_parser():
+    parser = argparse.ArgumentParser(
+        prog="dcli",
+        description="docker interactive cli - run without arguments for the interactive menus")
+    parser.add_argument("--context", metavar="name", help="endpoint to use, see 'dcli contexts'")
+    parser.add_argument("--snapshot", metavar="file", help="read from a snapshot file instead of the docker daemon")
+
+    modules = parser.add_subparsers(dest="module", metavar="module")
+
+    container = __add_module(modules, "container", "manage containers")
+    __add_command(container, "ls", "list containers", __ls_container)
+    container.choices["ls"].add_argument("--exited", action="store_true", help="list exited containers")
+    __add_command(container, "export-logs", "export logs of containers to compressed files", __export_logs)
+    container.choices["export-logs"].set_defaults(module="logexport", collection="containers")
+    container.choices["export-logs"].add_argument("names", nargs="+", metavar="container")
+    __add_export_arguments(container.choices["export-logs"])
+
+    image = __add_module(modules, "image", "manage images")
+    __add_command(image, "ls", "list images", __ls)
+
+    network = __add_module(modules, "network", "manage networks")
+    __add_command(network, "ls", "list networks", __ls)
+
+    node = __add_module(modules, "node", "manage nodes")
+    __add_command(node, "ls", "list nodes", __ls)
+    __add_command(node, "overview", "show an overview of all nodes", __node_overview)
+    __add_command(node, "capacity", "show reserved and free resources of the nodes", __node_capacity)
+    node.choices["capacity"].set_defaults(module="capacity")
+
+    service = __add_module(modules, "service", "manage services")
+    __add_command(service, "ls", "list services", __ls_service)
+    service.choices["ls"].add_argument("--all-clusters", action="store_true", help="list services of all endpoints")
+    __add_command(service, "capacity", "show reservations and whether one more replica fits", __service_capacity)
+    service.choices["capacity"].set_defaults(module="capacity")
+    __add_command(service, "export-logs", "export logs of services to compressed files, one per service",
+                  __export_logs)
+    service.choices["export-logs"].set_defaults(module="logexport", collection="services")
+    service.choices["export-logs"].add_argument("names", nargs="+", metavar="service",
+                                                help="service name prefix or 'all'")
+    __add_export_arguments(service.choices["export-logs"])
+    __add_command(service, "tasks", "show tasks of services", __service_tasks)
+    service.choices["tasks"].add_argument("services", nargs="?", default="all",
+                                          help="service name prefix or 'all'")
+    service.choices["tasks"].add_argument("--depth", type=int, help="number of finished tasks, default 40")
+    __add_command(service, "scale", "scale services", __service_scale)
+    service.choices["scale"].add_argument("replicas", nargs="+", metavar="service=replicas")
+
+    volume = __add_module(modules, "volume", "manage volumes")
+    __add_command(volume, "ls", "list volumes", __ls)
+
+    contexts = modules.add_parser("contexts", help="list the configured endpoints")
+    contexts.set_defaults(module="connections", handler=__contexts)
+
+    snapshot_parser = modules.add_parser("snapshot", help="save a compressed snapshot of the swarm state")
+    snapshot_parser.set_defaults(module="snapshot", handler=__snapshot)
+    snapshot_parser.add_argument("file", nargs="?", help="file to write, default dcli-snapshot-<date>.json.zst")
+
+    serve = modules.add_parser("serve", help="serve the swarm state as prometheus metrics and json on localhost")
+    serve.set_defaults(module="exporter", handler=__serve)
+    serve.add_argument("--port", type=int, default=9324, help="port to listen on, default 9324")
+    serve.add_argument("--interval", type=float, default=5, help="seconds between polls, default 5")
+    serve.add_argument("--stats-interval", type=float, metavar="seconds",
+                       help="collect disk and memory of the nodes via ssh every n seconds")
+
+    backend_parser = modules.add_parser("backend", help="run a shared backend the interactive sessions attach to")
+    backend_parser.set_defaults(module="backend", handler=__backend)
+    backend_parser.add_argument("--interval", type=float, default=2, help="seconds between polls, default 2")
+    backend_parser.add_argument("--stats-interval", type=float, default=30, metavar="seconds",
+                                help="seconds between collecting node stats via ssh, default 30, 0 disables it")
+
+    diff = modules.add_parser("diff", help="show what changed between two snapshots or a snapshot and live")
+    diff.set_defaults(module="diff", handler=__diff)
+    diff.add_argument("old", help="snapshot file of the old state")
+    diff.add_argument("new", nargs="?", help="snapshot file of the new state, default live state")
+    output = diff.add_mutually_exclusive_group()
+    output.add_argument("--json", action="store_true", help="print the result as json array")
+    output.add_argument("--jsonl", action="store_true", help="stream the result as json lines")
+
+    return parser
+
+
+def __add_module(modules, name, description):
+    parser = modules.add_parser(name, help=description)
+    parser.set_defaults(module=name, print_help=parser.print_help)
+
+    return parser.add_subparsers(dest="command", metavar="command")
+
+
+def __add_command(commands, name, description, handler):
+    parser = commands.add_parser(name, help=description)
+    parser.set_defaults(handler=handler)
+
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--json", action="store_true", help="print the result as json array")
+    output.add_argument("--jsonl", action="store_true", help="stream the result as json lines")
+
+    return parser
+
+
+def __add_export_arguments(parser):
+    parser.add_argument("--since", default="1h", help="start of the logs, e.g. 30m, 2h, 1d or a date, default 1h")
+    parser.add_argument("--until", help="end of the logs, default now")
+    parser.add_argument("--gzip", action="store_true", help="compress with gzip instead of zstandard")
+    parser.add_argument("--dir", default=".", help="directory of the files, default the current one")
+
+
+def __print_rows(rows, args, get_table=None):
+    """print the rows as json lines, json array or table"""
+    if args.jsonl:
+        for row in rows:
+            sys.stdout.write(json.dumps(row, default=str) + "\n")
+            sys.stdout.flush()
+    elif args.json:
+        json.dump(list(rows), sys.stdout, default=str, indent=2)
+        sys.stdout.write("\n")
+    elif get_table:
+        console.print(get_table(rows))
+    else:
+        table = Table(expand=True)
+        for row in rows:
+            if not table.columns:
+                for key in row:
+                    table.add_column(key.replace("_", " "))
+
+            table.add_row(*[__format_value(v) for v in row.values()])
+
+        console.print(table)
+
+
+def __format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "\n".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return "\n".join(f"{k}: {v}" for k, v in value.items())
+
+    return str(value)
+
+
+def __ls(module, args):
+    __print_rows(module.get_rows(), args)
+
+
+def __ls_container(module, args):
+    __print_rows(module.get_rows(running_containers_only=not args.exited), args)
+
+
+def __ls_service(module, args):
+    if args.all_clusters:
+        __print_rows(module.get_rows_all_clusters(), args)
+    else:
+        __print_rows(module.get_rows(), args)
+
+
+def __node_overview(module, args):
+    __print_rows(module.get_overview_rows(), args)
+
+
+def __node_capacity(module, args):
+    __print_rows(module.get_node_rows(), args)
+
+
+def __service_capacity(module, args):
+    __print_rows(module.get_service_rows(), args)
+
+
+def __export_logs(module, args):
+    collection = getattr(connections.client, args.collection)
+    missing = []
+
+    if args.collection == "services":
+        services = collection.list()
+        sources = [s for s in services if "all" in args.names or any(s.name.startswith(n) for n in args.names)]
+    else:
+        sources = []
+        for name in args.names:
+            try:
+                sources.append(collection.get(name))
+            except docker.errors.NotFound:
+                missing.append({"path": name, "lines": None, "bytes": None, "file_size": None, "error": "not found"})
+
+    if not sources and not missing:
+        console.print(f"no {args.collection} found for [orange3]{' '.join(args.names)}[/]")
+        return 1
+
+    os.makedirs(args.dir, exist_ok=True)
+
+    compression = "gz" if args.gzip else "zst"
+    jobs = [(s, os.path.join(args.dir, module.get_file_name(s.name, compression))) for s in sources]
+
+    # the progress goes to stderr, so the result can be piped
+    since, until = module.parse_time(args.since), module.parse_time(args.until)
+    results = module.export_all(Console(stderr=True), jobs, since, until) if jobs else []
+    results += missing
+    __print_rows(results, args, get_table=module.get_table)
+
+    return 1 if any(r["error"] for r in results) else 0
+
+
+def __service_tasks(module, args):
+    services = module.find_services(args.services)
+
+    if not services:
+        console.print(f"no services found for [orange3]{args.services}[/]")
+        return 1
+
+    __print_rows(module.get_task_rows(services, depth=args.depth), args)
+
+
+def __service_scale(module, args):
+    requests = []
+
+    for arg in args.replicas:
+        name, _, replicas = arg.partition("=")
+
+        if not name or not replicas.isdigit():
+            console.print(f"invalid argument [orange3]{arg}[/], expected service=replicas")
+            return 1
+
+        requests.append((name, int(replicas)))
+
+    # all services are looked up first, so a typo doesn't leave some of them scaled
+    services = []
+    for name, replicas in requests:
+        try:
+            services.append((module.client.services.get(name), replicas))
+        except docker.errors.NotFound:
+            console.print(f"service [orange3]{name}[/] not found, no service was scaled")
+            return 1
+
+    failed = False
+
+    def go():
+        nonlocal failed
+
+        for service, replicas in services:
+            try:
+                module.scale(service, replicas)
+                yield {"service": service.name, "replicas": replicas, "error": None}
+            except docker.errors.APIError as e:
+                failed = True
+                yield {"service": service.name, "replicas": replicas, "error": e.explanation or str(e)}
+
+    __print_rows(go(), args)
+
+    return 1 if failed else 0
+
+
+def __snapshot(_, args):
+    path = args.file or snapshot.get_file_name()
+
+    with console.status("capturing swarm state..."):
+        state = snapshot.capture(connections.client)
+        snapshot.save(state, path)
+
+    console.print(f"snapshot saved to [orange3]{path}[/]")
+
+
+def __serve(module, args):
+    module.serve(port=args.port, interval=args.interval, stats_interval=args.stats_interval)
+
+
+def __backend(module, args):
+    module.serve(interval=args.interval, stats_interval=args.stats_interval)
+
+
+def __diff(module, args):
+    old = snapshot.load(args.old)
+
+    if args.new:
+        new = snapshot.load(args.new)
+    else:
+        with console.status("capturing swarm state..."):
+            new = snapshot.capture(connections.client)
+
+    __print_rows(module.compare(old, new), args, get_table=module.get_table)
+
+
+def __contexts(module, _):
+    table = Table(expand=True)
+    table.add_column("name")
+    table.add_column("url")
+    table.add_column("tls")
+
+    for name, endpoint in module.get_endpoints().items():
+        active = " [orange3](active)[/]" if name == module.get_active() else ""
+        table.add_row(f"{name}{active}", endpoint.url or module.get_endpoint(), endpoint.tls or "")
+
+    console.print(table)
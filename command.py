@@ -1,4 +1,7 @@
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from command_handler import CommandHandler
 
 class Command:
     """
@@ -8,11 +11,16 @@ class Command:
     name: str
     description: str
     handler: Callable[[], bool]
+    menu: Callable[[], "CommandHandler"]
+    back: bool
 
-    def __init__(self, name: str, description: str, handler: Callable[[], bool]):
+    def __init__(self, name: str, description: str, handler: Callable[[], bool], menu=None, back=False):
         """
-        Initialize a command
+        Initialize a command, menu loads the handler of a sub menu
+        and back marks a command leaving the menu
         """
         self.name = name
         self.description = description
         self.handler = handler
+        self.menu = menu
+        self.back = back
@@ -2,6 +2,7 @@ import questionary
 from typing import Callable
 from rich.console import Console
 from command import Command
+import utils
 
 console = Console()
 
@@ -11,9 +12,11 @@ class CommandHandler:
     Class for command handling
     """
 
+    title: str
     commands: list[Command]
 
-    def __init__(self):
+    def __init__(self, title: str = None):
+        self.title = title
         self.commands = []
 
     def add_command(self, name: str, description: str, handler: Callable[[], None]):
@@ -22,6 +25,28 @@ class CommandHandler:
         """
         self.commands.append(Command(name, description, handler))
 
+    def add_menu(self, name: str, description: str, load_handler: Callable[[], "CommandHandler"]):
+        """
+        Add a command opening the sub menu of the handler load_handler returns
+        """
+        self.commands.append(Command(name, description, lambda: load_handler().start(), menu=load_handler))
+
+    def add_back(self, name: str = "back", description: str = "go back"):
+        """
+        Add a command leaving the menu
+        """
+        self.commands.append(Command(name, description, lambda: True, back=True))
+
+    def start(self):
+        """
+        Show the menu until a command returns True, like back
+        """
+        while True:
+            utils.header(self.title)
+
+            if self.show_command_chooser():
+                return False
+
     def get_commands(self) -> list[Command]:
         """
         Get all commands
@@ -0,0 +1,185 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+import docker
+import ratelimit
+import singleflight
+
+DEFAULT_HOST = "unix:///var/run/docker.sock"
+DEFAULT_NAME = "default"
+POOL_SIZE = 10
+
+
+@dataclass
+class Endpoint:
+    """Named docker endpoint"""
+
+    name: str
+    url: str = None
+    tls: str = None
+
+
+class ClientProxy:
+    """
+    Forwards all attribute access to the active docker client
+
+    the modules hold a reference to this proxy instead of a client,
+    so the client is only created on first use and can be replaced
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+
+__endpoints = None
+__clients = {}
+__active = DEFAULT_NAME
+__local = threading.local()
+__lock = threading.Lock()
+
+client = ClientProxy()
+
+
+def get_endpoints() -> dict[str, Endpoint]:
+    """
+    get all endpoints by name
+
+    besides the default endpoint from the environment, endpoints are
+    read from the json file in DCLI_ENDPOINTS (default
+    ~/.config/dcli/endpoints.json), e.g.
+    {"prod": {"url": "tcp://prod:2376", "tls": "/path/to/certs"}, "staging": {"url": "ssh://user@staging"}}
+    """
+    global __endpoints
+
+    if __endpoints is None:
+        __endpoints = {DEFAULT_NAME: Endpoint(DEFAULT_NAME)}
+        path = os.getenv("DCLI_ENDPOINTS") or os.path.expanduser("~/.config/dcli/endpoints.json")
+
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for name, config in json.load(file).items():
+                    __endpoints[name] = Endpoint(name, config["url"], config.get("tls"))
+
+    return __endpoints
+
+
+def get_active() -> str:
+    """get the name of the active endpoint"""
+    return getattr(__local, "name", None) or __active
+
+
+def get_client():
+    """get the client of the active endpoint, created on first use and kept for reuse"""
+    name = get_active()
+    active_client = __clients.get(name)
+
+    # created outside the lock, so connecting to one endpoint does not block the others
+    if active_client is None:
+        active_client = __create_client(get_endpoints()[name])
+
+        with __lock:
+            active_client = __clients.setdefault(name, active_client)
+
+    return active_client
+
+
+def get_endpoint():
+    """get the url of the active docker endpoint"""
+    endpoint = get_endpoints()[get_active()]
+    return endpoint.url or os.getenv("DOCKER_HOST") or DEFAULT_HOST
+
+
+def get_endpoint_key():
+    """get a short key of the active endpoint, naming the files kept per endpoint"""
+    return hashlib.sha1(get_endpoint().encode("utf-8")).hexdigest()[:16]
+
+
+def switch(name):
+    """make another endpoint the active one"""
+    global __active
+
+    if name not in get_endpoints():
+        raise Exception(f"unknown endpoint {name}")
+
+    __active = name
+
+
+def use(new_client, url=None):
+    """
+    add an already created client as endpoint and make it the active one
+
+    url is the one the client was created with, its base_url by default;
+    the docker sdk rewrites some urls (unix sockets become
+    http+docker://localhost), which would key the cache differently
+    """
+    url = url or new_client.api.base_url
+    name = url.split("://", 1)[0]
+
+    get_endpoints()[name] = Endpoint(name, url)
+
+    with __lock:
+        __clients[name] = new_client
+
+    switch(name)
+
+
+@contextmanager
+def using(name):
+    """use another endpoint in the current thread"""
+    previous = getattr(__local, "name", None)
+    __local.name = name
+
+    try:
+        yield
+    finally:
+        __local.name = previous
+
+
+def query_all(callback):
+    """
+    call the callback for each endpoint concurrently
+
+    yields (name, result, error) tuples as soon as they are available;
+    the callback runs with its endpoint as the active one
+    """
+    background = ratelimit.is_background()
+
+    def go(name):
+        with using(name), ratelimit.background(background):
+            return callback()
+
+    names = list(get_endpoints())
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(names)) as executor:
+        futures = {executor.submit(go, name): name for name in names}
+
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def __create_client(endpoint):
+    new_client = __connect(endpoint)
+    ratelimit.install(new_client.api, endpoint.name)
+    singleflight.install(new_client.api)
+    return new_client
+
+
+def __connect(endpoint):
+    if not endpoint.url:
+        return docker.from_env(max_pool_size=POOL_SIZE)
+
+    tls = None
+    if endpoint.tls:
+        tls = docker.tls.TLSConfig(
+            client_cert=(os.path.join(endpoint.tls, "cert.pem"), os.path.join(endpoint.tls, "key.pem")),
+            ca_cert=os.path.join(endpoint.tls, "ca.pem"),
+            verify=True)
+
+    return docker.DockerClient(base_url=endpoint.url, tls=tls, max_pool_size=POOL_SIZE)
@@ -1,73 +1,61 @@
 from rich.console import Console
 from rich.table import Table
-import docker
 import questionary
 from command_handler import CommandHandler
-from refresh import RefreshUntilKeyPressed
+from inspect_view import InspectView
+from table_view import TableView
+import attach
+import connections
+import logexport
+import records
 import utils
 import styles
 
 console = Console()
-client = docker.from_env()
+client = connections.client
 
 
 def start():
     """initial menu"""
+    return get_handler().start()
+
+
+def get_handler():
+    """get the commands of the menu"""
+    handler = CommandHandler("containers")
+    handler.add_back()
+    handler.add_command("exec", "execute a command in a container", cmd_exec)
+    handler.add_command("export logs", "export logs of a container to a compressed file", cmd_export_logs)
+    handler.add_command("inspect", "inspect a container", cmd_inspect)
+    handler.add_command("logs", "show logs of a container", cmd_logs)
+    handler.add_command("ls", "list all containers", cmd_ls)
+    handler.add_command("prune", "prune all stopped containers", cmd_prune)
+    handler.add_command("restart", "restart a container", cmd_restart)
+    handler.add_command("rm", "remove a container", cmd_rm)
+    handler.add_command("start", "start a container", cmd_start)
+    handler.add_command("stats", "show stats of a container", cmd_stats)
+    handler.add_command("stop", "stop a container", cmd_stop)
+
+    return handler
+
+
+__columns = [
+    ("id", "id"),
+    ("image", "image"),
+    ("name", "name"),
+    ("networks", "networks"),
+    ("ports", "ports"),
+    ("started at", "started_at"),
+    ("status", "status")]
 
-    while True:
-        __show_header()
-
-        handler = CommandHandler()
-        handler.add_command("back", "go back", lambda: True)
-        handler.add_command("exec", "execute a command in a container", cmd_exec)
-        handler.add_command("inspect", "inspect a container", cmd_inspect)
-        handler.add_command("logs", "show logs of a container", cmd_logs)
-        handler.add_command("ls", "list all containers", cmd_ls)
-        handler.add_command("prune", "prune all stopped containers", cmd_prune)
-        handler.add_command("restart", "restart a container", cmd_restart)
-        handler.add_command("rm", "remove a container", cmd_rm)
-        handler.add_command("start", "start a container", cmd_start)
-        handler.add_command("stats", "show stats of a container", cmd_stats)
-        handler.add_command("stop", "stop a container", cmd_stop)
-
-        if handler.show_command_chooser():
-            return False
-
-
-def __show_header():
-    utils.header("containers")
 
 def __get_table(running_containers_only=True, print_table=True):
     table = Table(expand=True)
-    table.add_column("id")
-    table.add_column("image", max_width=30)
-    table.add_column("name")
-    table.add_column("networks")
-    table.add_column("ports")
-    table.add_column("started at")
-    table.add_column("status")
-
-    filters = {
-        "status": "running" if running_containers_only else "exited"
-    }
+    for title, _ in __columns:
+        table.add_column(title, max_width=30 if title == "image" else None)
 
-    for container in sorted(client.containers.list(filters=filters), key=lambda c: c.name):
-        attrs = container.attrs
-
-        image = attrs["Config"]["Image"]
-
-        started_at = utils.format_date_time(attrs["State"]["StartedAt"])
-
-        color = "green" if running_containers_only else "red"
-
-        table.add_row(
-            container.short_id,
-            image,
-            container.name,
-            __get_networks(attrs),
-            __get_ports(attrs),
-            started_at,
-            f"[{color}]{container.status}[/]")
+    for row in get_rows(running_containers_only):
+        table.add_row(*__format_row(row))
 
     if print_table:
         console.print(table)
@@ -75,25 +63,34 @@ def __get_table(running_containers_only=True, print_table=True):
     return table
 
 
-def __get_ports(attrs):
-    ports = attrs["NetworkSettings"]["Ports"]
-    port_info = []
+def __format_row(row):
+    color = "green" if row["status"] == "running" else "red"
 
-    for _, (k, v) in enumerate(ports.items()):
-        if not v:
-            continue
+    return [
+        row["id"],
+        row["image"],
+        row["name"],
+        "\n".join(row["networks"]),
+        "\n".join(row["ports"]),
+        utils.format_date_time(row["started_at"]),
+        f"[{color}]{row['status']}[/]"]
 
-        port_info.append(f"{', '.join(set(map(lambda x: x["HostPort"], v)))} -> {k}")
 
-    return "\n".join(port_info)
-
-
-def __get_networks(attrs):
-    networks = []
-    for _, (k, _) in enumerate(attrs["NetworkSettings"]["Networks"].items()):
-        networks.append(k)
+def get_rows(running_containers_only=True):
+    """get the rows of the container table, one dict per container"""
+    filters = {
+        "status": "running" if running_containers_only else "exited"
+    }
 
-    return "\n".join(networks)
+    for container in sorted(records.get_containers(filters), key=lambda c: c.name):
+        yield {
+            "id": container.short_id,
+            "image": container.image,
+            "name": container.name,
+            "networks": list(container.networks),
+            "ports": list(container.ports),
+            "started_at": container.started_at,
+            "status": container.status}
 
 
 def __get_container_names():
@@ -130,19 +127,21 @@ def cmd_exec():
     if not container:
         return
 
-    while True:
-        cmd = questionary.text("enter command to execute").ask()
+    run_exec(container)
+
 
-        if not cmd or cmd == "exit":
-            return
+def run_exec(container):
+    """ask for a command and run it attached to the terminal, the container may be one of another node"""
+    cmd = questionary.text("enter command to execute, empty for a shell").ask()
 
-        with console.status("executing command..."):
-            stream = container.exec_run(cmd, stream=True, tty=True)
+    if cmd is None or cmd == "exit":
+        return
 
-        for line in stream.output:
-            console.print(line.decode("utf-8"), end="")
+    console.print(f"attached to [orange3]{container.name}[/], exit the command to detach")
+    exit_code = attach.exec_session(container.client.api, container.id, cmd or None)
 
-        console.print()
+    console.print(f"\r\ncommand exited with code {exit_code}")
+    questionary.press_any_key_to_continue("press any key to continue").ask()
 
 
 def cmd_inspect():
@@ -152,8 +151,7 @@ def cmd_inspect():
     if not container:
         return
 
-    console.print(container.attrs)
-    questionary.press_any_key_to_continue("press any key to continue").ask()
+    InspectView(console, f"container {container.name}", container.attrs).show()
 
 
 def cmd_logs():
@@ -163,6 +161,11 @@ def cmd_logs():
     if not container:
         return
 
+    show_logs(container)
+
+
+def show_logs(container):
+    """follow the logs of a container, the container may be one of another node"""
     with console.status("getting logs..."):
         logs = container.logs(
             tail=100,
@@ -173,9 +176,19 @@ def cmd_logs():
         console.print(log.decode("utf-8"), end="")
 
 
+def cmd_export_logs():
+    """export logs of a container to a compressed file"""
+    container = __get_auto_complete_container(running=False)
+
+    if not container:
+        return
+
+    logexport.ask_and_export(console, [container])
+
+
 def cmd_ls():
     """List all containers"""
-    RefreshUntilKeyPressed(console, __show_header, lambda: __get_table(print_table=False))
+    TableView(console, "containers", __columns, get_rows, __format_row).show()
 
 
 def cmd_prune():
@@ -228,6 +241,11 @@ def cmd_stats():
     if not container:
         return
 
+    show_stats(container)
+
+
+def show_stats(container):
+    """show the stats of a container, the container may be one of another node"""
     with console.status("getting stats..."):
         stats = container.stats(stream=False)
 
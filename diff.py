@@ -0,0 +1,194 @@
+from collections import Counter
+from rich.table import Table
+
+
+def compare(old, new):
+    """
+    compare two captured states and get one dict per change
+
+    services, nodes and networks are matched by id and compared field
+    by field; tasks are matched by id too, but reported per service
+    and state transition with a count, so the report stays compact
+    """
+    old_networks = __get_network_names(old)
+    new_networks = __get_network_names(new)
+
+    yield from __compare_objects(
+        "service",
+        __index(old["services"], "ID", lambda s: __get_service_fields(s, old_networks)),
+        __index(new["services"], "ID", lambda s: __get_service_fields(s, new_networks)))
+
+    yield from __compare_objects(
+        "node",
+        __index(old["nodes"], "ID", __get_node_fields),
+        __index(new["nodes"], "ID", __get_node_fields))
+
+    yield from __compare_objects(
+        "network",
+        __index(old["networks"], "Id", __get_network_fields),
+        __index(new["networks"], "Id", __get_network_fields))
+
+    yield from __compare_tasks(old, new)
+
+
+def get_table(changes):
+    """get a table of the changes returned by compare"""
+    table = Table(expand=True)
+    table.add_column("kind")
+    table.add_column("name")
+    table.add_column("change")
+    table.add_column("field")
+    table.add_column("old")
+    table.add_column("new")
+    table.add_column("count")
+
+    colors = {"added": "green", "removed": "red", "changed": "orange3"}
+
+    for change in changes:
+        table.add_row(
+            change["kind"],
+            change["name"],
+            f"[{colors[change['change']]}]{change['change']}[/]",
+            change["field"],
+            __format_value(change["old"]),
+            __format_value(change["new"]),
+            str(change["count"]))
+
+    return table
+
+
+def __format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "\n".join(str(v) for v in value)
+
+    return str(value)
+
+
+def __index(items, id_key, get_fields):
+    """index the objects by id, keeping only the compared fields"""
+    return {item[id_key]: get_fields(item) for item in items}
+
+
+def __compare_objects(kind, old, new):
+    changes = []
+
+    for object_id, fields in new.items():
+        old_fields = old.get(object_id)
+
+        if old_fields is None:
+            changes.append(__change(kind, fields["name"], "added"))
+            continue
+
+        for field, value in fields.items():
+            old_value = old_fields.get(field)
+
+            if value != old_value:
+                changes.append(__change(kind, fields["name"], "changed", field, old_value, value))
+
+    for object_id, fields in old.items():
+        if object_id not in new:
+            changes.append(__change(kind, fields["name"], "removed"))
+
+    return sorted(changes, key=lambda c: c["name"])
+
+
+def __compare_tasks(old, new):
+    old_tasks = {t["ID"]: t for t in old["tasks"]}
+    new_tasks = {t["ID"]: t for t in new["tasks"]}
+
+    service_names = {s["ID"]: s["Spec"]["Name"] for s in old["services"]}
+    service_names.update({s["ID"]: s["Spec"]["Name"] for s in new["services"]})
+
+    counter = Counter()
+
+    for task_id, task in new_tasks.items():
+        old_task = old_tasks.get(task_id)
+        state = task["Status"].get("State")
+
+        if old_task is None:
+            counter[(task.get("ServiceID"), "added", None, state)] += 1
+            continue
+
+        old_state = old_task["Status"].get("State")
+        if old_state != state:
+            counter[(task.get("ServiceID"), "changed", old_state, state)] += 1
+
+    for task_id, task in old_tasks.items():
+        if task_id not in new_tasks:
+            counter[(task.get("ServiceID"), "removed", task["Status"].get("State"), None)] += 1
+
+    changes = []
+    for (service_id, change, old_state, state), count in counter.items():
+        name = service_names.get(service_id, service_id)
+        changes.append(__change("tasks", name, change, "state", old_state, state, count))
+
+    return sorted(changes, key=lambda c: (c["name"], c["change"]))
+
+
+def __change(kind, name, change, field="", old=None, new=None, count=1):
+    return {
+        "kind": kind,
+        "name": name,
+        "change": change,
+        "field": field,
+        "old": old,
+        "new": new,
+        "count": count}
+
+
+def __get_network_names(state):
+    return {n["Id"]: n["Name"] for n in state["networks"]}
+
+
+def __get_service_fields(service, network_names):
+    spec = service["Spec"]
+    task_template = spec["TaskTemplate"]
+    mode = spec.get("Mode", {})
+
+    if "Replicated" in mode:
+        replicas = mode["Replicated"].get("Replicas")
+    else:
+        replicas = "global"
+
+    networks = []
+    for virtual_ip in service.get("Endpoint", {}).get("VirtualIPs") or []:
+        network_name = network_names.get(virtual_ip["NetworkID"], virtual_ip["NetworkID"])
+
+        if network_name != "ingress":
+            networks.append(network_name)
+
+    ports = []
+    for port in service.get("Endpoint", {}).get("Ports") or []:
+        ports.append(f"{port.get('PublishedPort')} -> {port['TargetPort']}/{port['Protocol']}")
+
+    update_status = service.get("UpdateStatus") or {}
+
+    return {
+        "name": spec["Name"],
+        "image": task_template["ContainerSpec"]["Image"].split("@", 1)[0],
+        "replicas": replicas,
+        "placement": sorted(task_template.get("Placement", {}).get("Constraints") or []),
+        "networks": sorted(networks),
+        "ports": sorted(ports),
+        "update status": update_status.get("State", "")}
+
+
+def __get_node_fields(node):
+    spec = node["Spec"]
+
+    return {
+        "name": node["Description"]["Hostname"],
+        "role": spec.get("Role"),
+        "availability": spec.get("Availability"),
+        "state": node.get("Status", {}).get("State"),
+        "labels": sorted(f"{k}={v}" for k, v in (spec.get("Labels") or {}).items()),
+        "engine": node["Description"].get("Engine", {}).get("EngineVersion")}
+
+
+def __get_network_fields(network):
+    return {
+        "name": network["Name"],
+        "driver": network.get("Driver"),
+        "scope": network.get("Scope")}
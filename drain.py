@@ -0,0 +1,176 @@
+import os
+import time
+from collections import Counter
+from contextlib import nullcontext
+from rich.console import Console, Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+import aio
+import connections
+import ratelimit
+import records
+import terminal
+import utils
+
+client = connections.client
+
+HELP = "[orange3]q/Enter[/] stop watching"
+
+
+def get_timeout():
+    """get the seconds to wait for the swarm to converge, set by DCLI_DRAIN_TIMEOUT"""
+    timeout = os.getenv("DCLI_DRAIN_TIMEOUT", "600")
+    return int(timeout) if timeout.isdigit() else 600
+
+
+def select_by_label(nodes, selector):
+    """get the nodes matching a label selector like 'zone=a' or 'gpu', several joined by ','"""
+    def matches(node):
+        labels = node.attrs["Spec"].get("Labels") or {}
+
+        for term in selector.split(","):
+            key, _, value = term.strip().partition("=")
+            if key not in labels or (value and labels[key] != value):
+                return False
+
+        return True
+
+    return [n for n in nodes if matches(n)]
+
+
+def set_availability(nodes, availability):
+    """set the availability of the nodes concurrently, the rest of their spec is kept"""
+    def update(node):
+        return lambda: node.update(dict(node.attrs["Spec"], Availability=availability))
+
+    aio.gather(*(update(n) for n in nodes))
+
+
+class DrainMonitor:
+    """
+    Tracks the tasks of nodes whose availability was changed
+
+    for drained nodes the replicated task slots running on them at the
+    start are followed until they run on another node, and the tasks
+    left on the nodes until they stopped; activated nodes converged as
+    soon as they report the new availability
+    """
+
+    def __init__(self, console: Console, nodes, availability):
+        """must be created before the availability is changed, to know the tasks to follow"""
+        self.console = console
+        self.node_names = {n.id: n.attrs["Description"]["Hostname"] for n in nodes}
+        self.availability = availability
+        self.started_at = time.time()
+        self.slots = {}
+        self.rows = []
+        self.error = None
+
+        if availability == "drain":
+            tasks = records.get_tasks(filters={"node": list(self.node_names), "desired-state": "running"})
+            self.slots = {(t.service_id, t.slot): t.node_id for t in tasks if t.state == "running" and t.slot}
+
+    def show(self, timeout=None):
+        """show the progress until the swarm converged, the timeout expired or the user stops watching"""
+        timeout = get_timeout() if timeout is None else timeout
+        interactive = terminal.is_interactive()
+
+        try:
+            with terminal.raw_mode() if interactive else nullcontext(), \
+                    Live(console=self.console, auto_refresh=False) as live:
+                while True:
+                    converged = self.__refresh()
+                    timed_out = time.time() - self.started_at > timeout
+
+                    live.update(self.__render(converged, timed_out), refresh=True)
+
+                    if converged or timed_out:
+                        break
+
+                    key = terminal.read_key(timeout=1) if interactive else time.sleep(1)
+                    if key in ("q", "enter", "escape"):
+                        break
+        except KeyboardInterrupt:
+            pass
+
+    def __refresh(self):
+        """load the tasks and update the rows, True if all nodes converged"""
+        node_ids = list(self.node_names)
+        service_ids = list({service_id for service_id, _ in self.slots})
+
+        try:
+            with ratelimit.background():
+                nodes, node_tasks, running_tasks = aio.gather(
+                    lambda: records.get_nodes(filters={"id": node_ids}),
+                    lambda: records.get_tasks(filters={"node": node_ids}),
+                    lambda: records.get_tasks(filters={"service": service_ids, "desired-state": "running"})
+                    if service_ids else [])
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+            return False
+
+        remaining = Counter(t.node_id for t in node_tasks if t.state == "running")
+
+        moved = Counter()
+        for task in running_tasks:
+            node_id = self.slots.get((task.service_id, task.slot))
+
+            if node_id and task.node_id != node_id and task.state == "running":
+                moved[node_id] += 1
+
+        slots = Counter(self.slots.values())
+        availabilities = {n.id: (n.availability, n.state) for n in nodes}
+
+        self.rows = []
+        for node_id, name in self.node_names.items():
+            availability, state = availabilities.get(node_id, ("unknown", "unknown"))
+
+            if self.availability == "drain":
+                converged = availability == "drain" and remaining[node_id] == 0 and moved[node_id] >= slots[node_id]
+            else:
+                converged = availability == self.availability
+
+            self.rows.append({
+                "node": name,
+                "availability": availability,
+                "state": state,
+                "remaining": remaining[node_id],
+                "rescheduled": moved[node_id],
+                "slots": slots[node_id],
+                "converged": converged})
+
+        return all(r["converged"] for r in self.rows)
+
+    def __render(self, converged, timed_out):
+        table = Table(expand=True)
+        table.add_column("node")
+        table.add_column("availability")
+        table.add_column("state")
+        table.add_column("tasks on node", justify="right")
+        table.add_column("rescheduled", justify="right")
+
+        for row in self.rows:
+            color = "green" if row["converged"] else "orange3"
+
+            table.add_row(
+                row["node"],
+                f"[{color}]{row['availability']}[/]",
+                row["state"],
+                str(row["remaining"]),
+                f"{row['rescheduled']}/{row['slots']}" if self.availability == "drain" else "")
+
+        status = f"waiting for {int(time.time() - self.started_at)}s"
+        if converged:
+            status = "[green]converged[/]"
+        elif timed_out:
+            status = f"[red]not converged after {int(time.time() - self.started_at)}s[/]"
+        if self.error:
+            status += f"  [red]{self.error}[/]"
+
+        return Group(
+            utils.get_header(f"{self.availability} nodes"),
+            Text.from_markup(HELP),
+            Text.from_markup(status),
+            table)
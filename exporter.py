@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rich.console import Console
+import node
+import ratelimit
+import service
+
+console = Console()
+
+DEFAULT_PORT = 9324
+
+
+class State:
+    """
+    Latest state of the swarm, refreshed by one poller
+
+    the rows are the same the views show; readers get the last
+    complete state, a failed poll keeps it and only sets the error
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.services = []
+        self.nodes = []
+        self.overview = []
+        self.stats = {}
+        self.updated_at = None
+        self.duration = None
+        self.error = None
+        self.errors = 0
+
+    def poll(self):
+        """load the rows of services, nodes and the node overview"""
+        started_at = time.time()
+
+        try:
+            # the repeated list calls of the three views share their responses
+            services = list(service.get_rows())
+            nodes = list(node.get_rows())
+            overview = list(node.get_overview_rows(self.stats))
+        except Exception as e:
+            with self.lock:
+                self.error = str(e)
+                self.errors += 1
+            return
+
+        with self.lock:
+            self.services = services
+            self.nodes = nodes
+            self.overview = overview
+            self.updated_at = time.time()
+            self.duration = self.updated_at - started_at
+            self.error = None
+
+    def get_json(self):
+        """get the state as json document"""
+        with self.lock:
+            return json.dumps({
+                "updated_at": self.updated_at,
+                "error": self.error,
+                "services": self.services,
+                "nodes": self.nodes,
+                "overview": self.overview}, default=str)
+
+    def get_metrics(self):
+        """get the state in the prometheus text format"""
+        with self.lock:
+            lines = []
+
+            def add(name, kind, help_text, samples):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+                for labels, value in samples:
+                    if value is None:
+                        continue
+
+                    label_text = ",".join(f'{k}="{self.__escape(v)}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+            add("dcli_service_replicas_desired", "gauge", "desired replicas of a service",
+                [({"service": s["name"]}, s["replicas"]) for s in self.services])
+            add("dcli_service_replicas_running", "gauge", "running tasks of a service",
+                [({"service": s["name"]}, s["running"]) for s in self.services])
+            add("dcli_service_update_state", "gauge", "update state of a service",
+                [({"service": s["name"], "state": s["update_status"]}, 1) for s in self.services if s["update_status"]])
+            add("dcli_node_info", "gauge", "role, state and availability of a node",
+                [({"node": n["host"], "role": n["role"], "state": n["state"], "availability": n["availability"]}, 1)
+                 for n in self.nodes])
+            add("dcli_node_tasks_running", "gauge", "running tasks on a node",
+                [({"node": o["node"]}, len(o["services"])) for o in self.overview])
+
+            for key, help_text in (
+                    ("disk_total", "disk size of a node"),
+                    ("disk_used", "used disk of a node"),
+                    ("mem_total", "memory of a node"),
+                    ("mem_used", "used memory of a node")):
+                add(f"dcli_node_{key}_bytes", "gauge", help_text,
+                    [({"node": o["node"]}, self.__to_bytes((o["stats"] or {}).get(key))) for o in self.overview])
+
+            add("dcli_poll_timestamp_seconds", "gauge", "time of the last successful poll", [({}, self.updated_at)])
+            add("dcli_poll_duration_seconds", "gauge", "duration of the last successful poll", [({}, self.duration)])
+            add("dcli_poll_errors_total", "counter", "failed polls", [({}, self.errors)])
+
+            return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __escape(value):
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    @staticmethod
+    def __to_bytes(gigabytes):
+        """the node stats are in GB"""
+        return None if gigabytes is None else int(gigabytes * 1024 ** 3)
+
+
+def serve(port=DEFAULT_PORT, interval=5.0, stats_interval=None):
+    """
+    poll the swarm every interval seconds and serve the state on localhost
+
+    /metrics is in the prometheus text format, /state is json; node
+    stats are collected via ssh every stats_interval seconds, not at
+    all without one
+    """
+    state = State()
+    state.poll()
+
+    threading.Thread(target=__run_poller, args=(state.poll, interval), daemon=True).start()
+
+    if stats_interval:
+        threading.Thread(
+            target=__run_poller,
+            args=(lambda: node.load_stats(state.stats), stats_interval),
+            daemon=True).start()
+
+    class Handler(BaseHTTPRequestHandler):
+        """Serves the state, the docker daemon is never asked for a request"""
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """answer /metrics and /state"""
+            if self.path == "/metrics":
+                self.__send(state.get_metrics(), "text/plain; version=0.0.4")
+            elif self.path == "/state":
+                self.__send(state.get_json(), "application/json")
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+        def __send(self, text, content_type):
+            body = text.encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    console.print(f"serving [orange3]http://127.0.0.1:{port}/metrics[/] and [orange3]/state[/], "
+                  f"polling every {interval:g}s")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def __run_poller(poll, interval):
+    with ratelimit.background():
+        while True:
+            time.sleep(interval)
+            poll()
@@ -1,60 +1,131 @@
+from datetime import datetime, timezone
 from rich.console import Console
 from rich.table import Table
-import docker
 import questionary
 from command_handler import CommandHandler
 from refresh import RefreshUntilKeyPressed
+import connections
 import utils
 
 console = Console()
-client = docker.from_env()
+client = connections.client
 
 
 def start():
     """initial menu"""
+    return get_handler().start()
 
-    while True:
-        __show_header()
 
-        handler = CommandHandler()
-        handler.add_command("back", "go back", lambda: True)
-        handler.add_command("ls", "list all images", cmd_ls)
-        handler.add_command("prune", "prune all unused images", cmd_prune)
+def get_handler():
+    """get the commands of the menu"""
+    handler = CommandHandler("images")
+    handler.add_back()
+    handler.add_command("ls", "list all images", cmd_ls)
+    handler.add_command("prune", "prune all unused images", cmd_prune)
 
-        if handler.show_command_chooser():
-            return False
+    return handler
 
 def __show_header():
     utils.header("images")
 
 
 def __get_table(print_table=True):
+    usage = client.df()
+
     table = Table(expand=True)
     table.add_column("id")
     table.add_column("name")
     table.add_column("tag")
     table.add_column("created at")
+    table.add_column("size", justify="right")
+    table.add_column("shared size", justify="right")
+    table.add_column("containers", justify="right")
+
+    for row in get_rows(usage):
+        table.add_row(
+            row["id"],
+            row["name"],
+            f"[red]{row['tag']}[/]" if row["dangling"] else row["tag"],
+            utils.format_date_time(row["created_at"]),
+            utils.format_size(row["size"]),
+            utils.format_size(row["shared_size"]),
+            "" if row["containers"] is None else str(row["containers"]))
+
+    count, size = get_prune_estimate(usage)
+    table.caption = f"total {utils.format_size(get_total_size(usage))}, " \
+                    f"reclaimable {utils.format_size(get_reclaimable_size(usage))}, " \
+                    f"prune frees {utils.format_size(size)} of {count} dangling images"
+
+    if print_table:
+        console.print(table)
+
+    return table
+
+
+def get_rows(usage=None):
+    """
+    get the rows of the image table, one dict per image
+
+    all values come from the disk usage of the daemon, so there is
+    no inspect per image; sizes and container counts are None if
+    the daemon did not calculate them
+    """
+    usage = usage or client.df()
 
-    for image in sorted(client.images.list(), key=lambda c: " ".join(c.tags)):
-        digests = image.attrs.get("RepoDigests", [])
-        digest = digests[0] if len(digests) > 0 else ""
-        name = digest.split("@")[0]
+    for image in sorted(usage.get("Images") or [], key=lambda i: " ".join(i.get("RepoTags") or [])):
+        digests = image.get("RepoDigests") or []
+        name = digests[0].split("@")[0] if len(digests) > 0 else ""
 
         if not name:
             name = "<none>"
 
-        tag = image.tags[0].split(":")[1] if len(image.tags) > 0 else "<none>"
+        tags = __get_tags(image)
+        tag = tags[0].rsplit(":", 1)[1] if len(tags) > 0 else "<none>"
 
-        table.add_row(
-            image.short_id,
-            name,
-            tag,
-            utils.format_date_time(image.attrs["Created"]))
+        created_at = image["Created"]
+        if isinstance(created_at, int):
+            created_at = datetime.fromtimestamp(created_at, timezone.utc).isoformat()
 
-    if print_table:
-        console.print(table)
+        yield {
+            "id": image["Id"][:19] if image["Id"].startswith("sha256:") else image["Id"][:12],
+            "name": name,
+            "tag": tag,
+            "created_at": created_at,
+            "size": __get_known(image, "Size"),
+            "shared_size": __get_known(image, "SharedSize"),
+            "containers": __get_known(image, "Containers"),
+            "dangling": len(tags) == 0}
+
+
+def get_total_size(usage):
+    """get the disk space used by all image layers"""
+    return usage.get("LayersSize") or sum(i.get("Size") or 0 for i in usage.get("Images") or [])
+
+
+def get_reclaimable_size(usage):
+    """get the space freed by removing all images not used by a container"""
+    return sum(__get_unique_size(i) for i in usage.get("Images") or [] if i.get("Containers") == 0)
+
+
+def get_prune_estimate(usage):
+    """get the number of images and the space image prune frees, it removes unused dangling images only"""
+    images = [i for i in usage.get("Images") or [] if i.get("Containers") == 0 and not __get_tags(i)]
+    return len(images), sum(__get_unique_size(i) for i in images)
 
-    return table
+
+def __get_tags(image):
+    return [t for t in image.get("RepoTags") or [] if t != "<none>:<none>"]
+
+
+def __get_known(image, key):
+    """get a size or count, the daemon reports -1 if it was not calculated"""
+    value = image.get(key)
+    return None if value is None or value < 0 else value
+
+
+def __get_unique_size(image):
+    """get the size of the layers not shared with other images"""
+    return max((image.get("Size") or 0) - max(image.get("SharedSize") or 0, 0), 0)
 
 
 def cmd_ls():
@@ -64,10 +135,18 @@ def cmd_ls():
 
 def cmd_prune():
     """prune all unused images"""
+    with console.status("calculating disk usage..."):
+        count, size = get_prune_estimate(client.df())
+
+    console.print(f"prune frees about [orange3]{utils.format_size(size)}[/] of {count} dangling images")
     answer = questionary.confirm("are you sure you want to prune all unused images?").ask()
 
     if not answer:
         return
 
     with console.status("pruning images..."):
-        client.images.prune()
+        result = client.images.prune()
+
+    console.print(f"{len(result.get('ImagesDeleted') or [])} images deleted, "
+                  f"{utils.format_size(result.get('SpaceReclaimed') or 0)} reclaimed")
+    questionary.press_any_key_to_continue("press any key to continue").ask()
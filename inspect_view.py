@@ -0,0 +1,365 @@
+import json
+import re
+from rich.console import Console, Group
+from rich.live import Live
+from rich.markup import escape
+from rich.text import Text
+import terminal
+import utils
+
+HELP = "[orange3]↑↓ PgUp PgDn[/] move  [orange3]→/←[/] expand/collapse  [orange3]e[/] expand all below  " \
+       "[orange3]c[/] collapse all  [orange3]/[/] query  [orange3]n[/] next match  [orange3]q[/] exit"
+
+QUERY_STEP = re.compile(r'\s*(?:(\.\.)|\.?\["([^"]*)"\]|\.?\[(-?\d+|\*)\]|\.?([^.\[\]\s]+))')
+
+
+def parse_query(query):
+    """
+    split a path like .Spec.TaskTemplate.ContainerSpec.Env[3] into steps
+
+    besides keys and [n] indexes, * or [*] match every child, ..Key
+    finds Key at any depth and ["a.b"] quotes keys with dots; keys
+    match case-insensitively if there is no exact match
+    """
+    steps = []
+    position = 0
+    query = query.strip()
+
+    # the root, as format_path shows it
+    if query == ".":
+        return steps
+
+    while position < len(query):
+        match = QUERY_STEP.match(query, position)
+        if not match or match.end() == position:
+            raise ValueError(f"invalid query at '{query[position:]}'")
+
+        descend, quoted, index, key = match.groups()
+
+        if descend:
+            steps.append(("descend", None))
+        elif quoted is not None:
+            steps.append(("key", quoted))
+        elif index is not None:
+            steps.append(("any", None) if index == "*" else ("index", int(index)))
+        elif key == "*":
+            steps.append(("any", None))
+        else:
+            steps.append(("key", key))
+
+        position = match.end()
+
+    return steps
+
+
+def find(data, query):
+    """get the paths matching a query, in document order"""
+    steps = parse_query(query)
+
+    def walk(value, path, step):
+        if step == len(steps):
+            yield path
+            return
+
+        kind, arg = steps[step]
+
+        if kind == "descend":
+            yield from walk(value, path, step + 1)
+
+            for key, child in get_children(value):
+                yield from walk(child, path + (key,), step)
+        elif kind == "any":
+            for key, child in get_children(value):
+                yield from walk(child, path + (key,), step + 1)
+        elif kind == "index":
+            if isinstance(value, list) and -len(value) <= arg < len(value):
+                index = arg % len(value)
+                yield from walk(value[index], path + (index,), step + 1)
+        elif isinstance(value, dict):
+            key = arg if arg in value else next((k for k in value if str(k).lower() == arg.lower()), None)
+
+            if key is not None:
+                yield from walk(value[key], path + (key,), step + 1)
+
+    # a field found by .. may be found again below a wildcard
+    return list(dict.fromkeys(walk(data, (), 0)))
+
+
+def get_children(value):
+    """get the (key, child) pairs of a dict or list, none of a scalar"""
+    if isinstance(value, dict):
+        return value.items()
+    # an enumerate is truthy even for an empty list, which has no children
+    if isinstance(value, list) and value:
+        return enumerate(value)
+
+    return ()
+
+
+def format_path(path):
+    """format a path the way a query selects it"""
+    text = ""
+
+    for key in path:
+        if isinstance(key, int):
+            text += f"[{key}]"
+        elif re.fullmatch(r"[^.\[\]\s\"]+", str(key)):
+            text += f".{key}"
+        else:
+            text += f'["{key}"]'
+
+    return text or "."
+
+
+class InspectView:
+    """
+    Collapsible tree of a large object, like the attrs of a service
+
+    only the expanded containers have lines, a container's children
+    are added when it is expanded and removed when it is collapsed;
+    only the lines fitting on the screen are rendered, so opening a
+    service with hundreds of env variables is instant
+    """
+
+    def __init__(self, console: Console, title: str, data):
+        self.console = console
+        self.title = title
+        self.data = data
+        self.expanded = {()}
+        self.lines = list(self.__get_child_lines((), data, 0))
+        self.cursor = 0
+        self.offset = 0
+        self.query = ""
+        self.query_mode = False
+        self.matches = []
+        self.match = 0
+        self.message = ""
+
+    def show(self):
+        """show the view until it is closed by the user"""
+        if not terminal.is_interactive():
+            self.console.print(self.data)
+            return
+
+        try:
+            with terminal.raw_mode(), Live(console=self.console, screen=True, auto_refresh=False) as live:
+                live.update(self.__render(), refresh=True)
+
+                while True:
+                    key = terminal.read_key()
+
+                    if not self.__handle_key(key):
+                        break
+
+                    live.update(self.__render(), refresh=True)
+        except KeyboardInterrupt:
+            pass
+
+    def expand(self, index, recursive=False):
+        """add the lines of the children of the container at a line"""
+        path, depth, _, value = self.lines[index]
+
+        if not get_children(value):
+            return
+
+        if recursive:
+            self.collapse(index)
+            self.expanded.update(self.__get_container_paths(path, value))
+
+        if path in self.expanded and not recursive:
+            return
+
+        self.expanded.add(path)
+        self.lines[index + 1:index + 1] = list(self.__get_child_lines(path, value, depth + 1))
+
+    def collapse(self, index):
+        """remove the lines below the container at a line"""
+        path, depth, _, _ = self.lines[index]
+        self.expanded.discard(path)
+
+        end = index + 1
+        while end < len(self.lines) and self.lines[end][1] > depth:
+            end += 1
+
+        del self.lines[index + 1:end]
+
+    def jump(self, path):
+        """expand the containers above a path and move the cursor to it, to the top for the root"""
+        index = -1
+
+        if not path:
+            self.cursor = 0
+            return
+
+        for length in range(1, len(path) + 1):
+            index = self.__find_line(path[:length], index + 1)
+
+            if length < len(path):
+                self.expand(index)
+
+        self.cursor = index
+
+        # a container the query points to is shown expanded
+        self.expand(self.cursor)
+
+    def __get_child_lines(self, path, value, depth):
+        """get the lines of the children, and of their children if they were expanded before"""
+        for key, child in get_children(value):
+            child_path = path + (key,)
+            yield child_path, depth, key, child
+
+            if child_path in self.expanded:
+                yield from self.__get_child_lines(child_path, child, depth + 1)
+
+    @staticmethod
+    def __get_container_paths(path, value):
+        stack = [(path, value)]
+
+        while stack:
+            path, value = stack.pop()
+            if get_children(value):
+                yield path
+                stack.extend((path + (key,), child) for key, child in get_children(value))
+
+    def __find_line(self, path, start):
+        for index in range(start, len(self.lines)):
+            if self.lines[index][0] == path:
+                return index
+
+        raise ValueError(f"{format_path(path)} not found")
+
+    def __handle_key(self, key):
+        """handle a key, return False to close the view"""
+        page = max(self.__get_visible_height() - 1, 1)
+
+        if not self.query_mode:
+            self.message = ""
+
+        if self.query_mode:
+            self.__handle_query_key(key)
+        elif key in ("q", "escape"):
+            return False
+        elif key in ("down", "j"):
+            self.cursor += 1
+        elif key in ("up", "k"):
+            self.cursor -= 1
+        elif key in ("pagedown", " "):
+            self.cursor += page
+        elif key == "pageup":
+            self.cursor -= page
+        elif key in ("home", "g"):
+            self.cursor = 0
+        elif key in ("end", "G"):
+            self.cursor = len(self.lines) - 1
+        elif key in ("right", "enter", "l") and self.lines:
+            self.expand(self.cursor)
+        elif key in ("left", "h") and self.lines:
+            self.__collapse_or_parent()
+        elif key == "e" and self.lines:
+            self.expand(self.cursor, recursive=True)
+        elif key == "c":
+            self.expanded = {()}
+            self.lines = list(self.__get_child_lines((), self.data, 0))
+            self.cursor = 0
+        elif key == "/":
+            self.query_mode = True
+        elif key == "n" and self.matches:
+            self.match = (self.match + 1) % len(self.matches)
+            self.jump(self.matches[self.match])
+
+        self.cursor = min(max(self.cursor, 0), max(len(self.lines) - 1, 0))
+        return True
+
+    def __collapse_or_parent(self):
+        path, _, _, value = self.lines[self.cursor]
+
+        if path in self.expanded and get_children(value):
+            self.collapse(self.cursor)
+        elif len(path) > 1:
+            self.cursor = self.__find_line(path[:-1], 0)
+
+    def __handle_query_key(self, key):
+        if key == "enter":
+            self.query_mode = False
+            self.__run_query()
+        elif key == "escape":
+            self.query_mode = False
+        elif key == "backspace":
+            self.query = self.query[:-1]
+        elif key.isprintable() and key not in terminal.KEYS.values():
+            self.query += key
+
+    def __run_query(self):
+        try:
+            self.matches = find(self.data, self.query) if self.query else []
+        except ValueError as e:
+            self.matches = []
+            self.message = f"[red]{escape(str(e))}[/]"
+            return
+
+        self.match = 0
+
+        if self.matches:
+            self.jump(self.matches[0])
+        else:
+            self.message = "[red]no match[/]"
+
+    def __get_header(self, status=""):
+        return Group(
+            utils.get_header(self.title),
+            Text.from_markup(HELP),
+            Text.from_markup(status))
+
+    def __get_visible_height(self):
+        """get the number of lines available for the tree"""
+        header_height = len(self.console.render_lines(self.__get_header(), pad=False))
+        return max(self.console.size.height - header_height, 1)
+
+    def __render(self):
+        height = self.__get_visible_height()
+
+        # the cursor stays on the screen
+        self.offset = min(self.offset, self.cursor)
+        self.offset = max(self.offset, self.cursor - height + 1)
+
+        lines = []
+        for index in range(self.offset, min(self.offset + height, len(self.lines))):
+            line = self.__format_line(*self.lines[index])
+
+            if index == self.cursor:
+                line.stylize("reverse")
+
+            lines.append(line)
+
+        path = format_path(self.lines[self.cursor][0]) if self.lines else "."
+        status = f"[orange3]{escape(path)}[/]"
+
+        if self.query_mode:
+            status += f"  query: [orange3]{escape(self.query)}[/]▏"
+        elif self.matches:
+            status += f"  match {self.match + 1} of {len(self.matches)}"
+        if self.message:
+            status += f"  {self.message}"
+
+        return Group(self.__get_header(status), *lines)
+
+    def __format_line(self, path, depth, key, value):
+        children = get_children(value)
+
+        text = Text("  " * depth, no_wrap=True, overflow="ellipsis")
+        text.append("▾ " if path in self.expanded else "▸ " if children else "  ", style="orange3")
+        text.append(f"[{key}]" if isinstance(key, int) else str(key), style="bold")
+        text.append(": ")
+
+        if isinstance(value, dict):
+            text.append(f"{{{len(value)} keys}}", style="dim")
+        elif isinstance(value, list):
+            text.append(f"[{len(value)} items]", style="dim")
+        elif isinstance(value, str):
+            text.append(json.dumps(value, ensure_ascii=False), style="green")
+        elif isinstance(value, bool) or value is None:
+            text.append(json.dumps(value), style="magenta")
+        else:
+            text.append(str(value), style="cyan")
+
+        return text
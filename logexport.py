@@ -0,0 +1,229 @@
+import gzip
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from rich.console import Console
+from rich.progress import FileSizeColumn, Progress, ProgressColumn, TextColumn, TimeElapsedColumn, TransferSpeedColumn
+from rich.table import Table
+from rich.text import Text
+from docker.models.services import Service
+import questionary
+import zstandard
+import aio
+import utils
+
+DURATION = re.compile(r"^(\d+)([smhd])$")
+DURATION_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+# the progress is reported at most every this many seconds
+PROGRESS_INTERVAL = 0.2
+
+
+class LinesSpeedColumn(ProgressColumn):
+    """Lines per second of an export"""
+
+    def render(self, task):
+        lines = task.fields.get("lines", 0)
+        speed = lines / task.elapsed if task.elapsed else 0
+
+        return Text(f"{lines} lines {speed:.0f} lines/s", style="progress.data.speed")
+
+
+def parse_time(text):
+    """
+    get the unix timestamp of a time like 30m, 2h or 1d before now
+    or of a datetime, None if the text is empty
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+
+    match = DURATION.match(text)
+    if match:
+        return int((datetime.now(timezone.utc) - timedelta(**{DURATION_UNITS[match[2]]: int(match[1])})).timestamp())
+
+    return int(utils.parse_date_time(text).timestamp())
+
+
+def get_file_name(name, compression="zst"):
+    """get a default file name for the logs of a container or service"""
+    return f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.log.{compression}"
+
+
+def open_file(path):
+    """open a file for writing, zstandard compressed for .zst and gzip compressed for .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "wb", compresslevel=6)
+
+    file = open(path, "wb")
+
+    if path.endswith(".zst"):
+        return zstandard.ZstdCompressor(level=3).stream_writer(file)
+
+    return file
+
+
+def export(source, path, since=None, until=None, on_progress=None, stop=None):
+    """
+    stream the logs of a container or service with timestamps into a file
+
+    the logs are written as they arrive, so the memory stays the same
+    for any amount of logs; on_progress is called with the lines and
+    bytes written so far, the export ends early when stop is set.
+    Returns the number of lines and bytes written
+    """
+    kwargs = {"stdout": True, "stderr": True, "timestamps": True, "follow": False, "since": since}
+    cutoff = None
+
+    if isinstance(source, Service):
+        # the service logs have no until, the lines after it are skipped by their timestamp
+        if until:
+            cutoff = datetime.fromtimestamp(until, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S").encode("ascii")
+    else:
+        kwargs.update(stream=True, until=until)
+
+    logs = source.logs(**kwargs)
+    chunks = logs if cutoff is None else __filter_lines(logs, cutoff)
+    lines = 0
+    size = 0
+    reported_at = time.monotonic()
+
+    try:
+        with open_file(path) as file:
+            for chunk in chunks:
+                file.write(chunk)
+                lines += chunk.count(b"\n")
+                size += len(chunk)
+
+                if stop and stop.is_set():
+                    break
+
+                if on_progress and time.monotonic() - reported_at > PROGRESS_INTERVAL:
+                    on_progress(lines, size)
+                    reported_at = time.monotonic()
+    finally:
+        if hasattr(logs, "close"):
+            logs.close()
+
+    if on_progress:
+        on_progress(lines, size)
+
+    return lines, size
+
+
+def export_all(console: Console, jobs, since=None, until=None):
+    """
+    export the logs of several (source, path) jobs concurrently, one file
+    each, with the progress of every job
+
+    returns one dict per job with its path, lines, bytes, the size of
+    the file and the error if it failed
+    """
+    stop = threading.Event()
+
+    with Progress(
+            TextColumn("{task.description}"),
+            FileSizeColumn(),
+            TransferSpeedColumn(),
+            LinesSpeedColumn(),
+            TimeElapsedColumn(),
+            console=console) as progress:
+
+        def run(source, path):
+            task = progress.add_task(path, total=None, lines=0)
+            result = {"path": path, "lines": None, "bytes": None, "file_size": None, "error": None}
+
+            try:
+                result["lines"], result["bytes"] = export(
+                    source,
+                    path,
+                    since,
+                    until,
+                    lambda lines, size: progress.update(task, completed=size, lines=lines),
+                    stop)
+                result["file_size"] = os.path.getsize(path)
+                progress.update(task, description=f"[green]{path}[/]")
+            except Exception as e:
+                result["error"] = str(e)
+                progress.update(task, description=f"[red]{path}[/]")
+            finally:
+                progress.stop_task(task)
+
+            return result
+
+        try:
+            return aio.gather(*(lambda s=s, p=p: run(s, p) for s, p in jobs))
+        except KeyboardInterrupt:
+            stop.set()
+            raise
+
+
+def get_table(results):
+    """get a table of the results of export_all"""
+    table = Table(expand=True)
+    table.add_column("file")
+    table.add_column("lines", justify="right")
+    table.add_column("logs", justify="right")
+    table.add_column("file size", justify="right")
+
+    for result in results:
+        if result["error"]:
+            table.add_row(result["path"], f"[red]{result['error']}[/]", "", "")
+        else:
+            table.add_row(
+                result["path"],
+                str(result["lines"]),
+                utils.format_size(result["bytes"]),
+                utils.format_size(result["file_size"]))
+
+    return table
+
+
+def ask_and_export(console: Console, sources):
+    """ask for the time window and compression, then export the logs of the containers or services"""
+    since = questionary.text("export logs since (e.g. 30m, 2h, 1d or a date)", default="1h").ask()
+    if since is None:
+        return
+
+    until = questionary.text("until (empty for now)").ask()
+    if until is None:
+        return
+
+    compression = questionary.select("compression", choices=["zst", "gz"]).ask()
+    if not compression:
+        return
+
+    try:
+        since, until = parse_time(since), parse_time(until)
+    except ValueError as e:
+        console.print(f"[red]invalid time:[/] {e}")
+        questionary.press_any_key_to_continue("press any key to continue").ask()
+        return
+
+    jobs = [(source, get_file_name(source.name, compression)) for source in sources]
+
+    try:
+        results = export_all(console, jobs, since, until)
+        console.print(get_table(results))
+    except KeyboardInterrupt:
+        console.print("[red]export stopped[/]")
+
+    questionary.press_any_key_to_continue("press any key to continue").ask()
+
+
+def __filter_lines(chunks, cutoff):
+    """split the chunks into lines, skipping the lines with a timestamp after the cutoff"""
+    rest = b""
+
+    for chunk in chunks:
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+
+        for line in lines:
+            if line[:19] <= cutoff:
+                yield line + b"\n"
+
+    if rest and rest[:19] <= cutoff:
+        yield rest
@@ -1,39 +1,63 @@
 #!/usr/bin/env python3.12
 
+import importlib
+import os
+import sys
+import questionary
 from rich.console import Console
 from rich.traceback import install
 from command_handler import CommandHandler
-import utils
-import container
-import image
-import network
-import node
-import service
-import volume
-import system
+import cli
+import connections
+import shell
+import terminal
 
 install()
 console = Console()
 
 
 def start():
-    """initial menu"""
-
-    while True:
-        utils.header("docker interactive cli")
-
-        handler = CommandHandler()
-        handler.add_command("exit", "exit the program", exit)
-        handler.add_command("container", "manage containers", container.start)
-        handler.add_command("image", "manage images", image.start)
-        handler.add_command("network", "manage networks", network.start)
-        handler.add_command("node", "manage nodes", node.start)
-        handler.add_command("service", "manage services", service.start)
-        handler.add_command("volume", "manage volumes", volume.start)
-        handler.add_command("system", "system info and manage", system.start)
-
-        if handler.show_command_chooser():
-            break
-
-
-start()
+    """
+    initial menu, in the full-screen shell unless DCLI_CLASSIC=1
+    is set or the terminal can't show it
+    """
+    if os.getenv("DCLI_CLASSIC") == "1" or not terminal.is_interactive():
+        get_handler().start()
+    else:
+        shell.Shell(get_handler()).run()
+
+
+def get_handler():
+    """get the commands of the initial menu"""
+    handler = CommandHandler("docker interactive cli")
+    handler.add_back("exit", "exit the program")
+    handler.add_command("context", "switch the docker endpoint", cmd_context)
+    handler.add_menu("container", "manage containers", __module("container"))
+    handler.add_menu("image", "manage images", __module("image"))
+    handler.add_menu("network", "manage networks", __module("network"))
+    handler.add_menu("node", "manage nodes", __module("node"))
+    handler.add_menu("service", "manage services", __module("service"))
+    handler.add_menu("volume", "manage volumes", __module("volume"))
+    handler.add_menu("system", "system info and manage", __module("system"))
+
+    return handler
+
+
+def cmd_context():
+    """switch the docker endpoint"""
+    name = questionary.select(
+        "select an endpoint",
+        choices=list(connections.get_endpoints()),
+        default=connections.get_active()).ask()
+
+    if name:
+        connections.switch(name)
+
+
+def __module(name):
+    """import the module on first use and get the handler of its menu"""
+    return lambda: importlib.import_module(name).get_handler()
+
+
+if __name__ == "__main__":
+    sys.exit(cli.run(sys.argv[1:], start))
@@ -1,47 +1,55 @@
+from collections import Counter, defaultdict
+import docker
 from rich.console import Console
 from rich.table import Table
-import docker
 import questionary
 from command_handler import CommandHandler
 from refresh import RefreshUntilKeyPressed
+import aio
+import connections
 import utils
 import styles
 
 console = Console()
-client = docker.from_env()
+client = connections.client
 
 
 def start():
     """initial menu"""
+    return get_handler().start()
 
-    while True:
-        __show_header()
 
-        handler = CommandHandler()
-        handler.add_command("back", "go back", lambda: True)
-        handler.add_command("ls", "list all networks", cmd_ls)
-        handler.add_command("prune", "prune all unused networks", cmd_prune)
-        handler.add_command("rm", "remove a network", cmd_rm)
+def get_handler():
+    """get the commands of the menu"""
+    handler = CommandHandler("networks")
+    handler.add_back()
+    handler.add_command("ls", "list all networks", cmd_ls)
+    handler.add_command("prune", "prune all unused networks", cmd_prune)
+    handler.add_command("rm", "remove a network", cmd_rm)
+    handler.add_command("rm unused", "remove all unused overlay networks", cmd_rm_unused)
 
-        if handler.show_command_chooser():
-            return False
+    return handler
 
 
 def __show_header():
     utils.header("networks")
 
 
-def __get_table(print_table=True):
+def __get_table(print_table=True, rows=None):
     table = Table(expand=True)
     table.add_column("id")
     table.add_column("driver")
     table.add_column("name")
+    table.add_column("services")
+    table.add_column("containers")
 
-    for network in sorted(client.networks.list(), key=lambda c: c.name):
+    for row in rows if rows is not None else get_rows():
         table.add_row(
-            network.short_id, 
-            network.attrs.get("Driver"),
-            network.name)
+            row["id"],
+            row["driver"],
+            f"[red]{row['name']}[/]" if row["unused"] else row["name"],
+            __format_names(row["services"]),
+            __format_names(row["containers"]))
 
     if print_table:
         console.print(table)
@@ -49,23 +57,83 @@ def __get_table(print_table=True):
     return table
 
 
-def __get_network_names():
-    return [network.name for network in client.networks.list()]
+def __format_names(names):
+    return f"{len(names)} [grey50]{', '.join(names)}[/]" if names else "0"
+
+
+def get_rows():
+    """
+    get the rows of the network table, one dict per network
+
+    the attached services and containers are indexed by network id in
+    one pass over the service virtual ips and the container networks,
+    without inspecting the networks
+    """
+    networks, services, containers = aio.gather(
+        client.networks.list,
+        client.services.list,
+        lambda: client.containers.list(all=True, sparse=True))
+
+    network_ids = {n.name: n.id for n in networks}
+    attached_services = defaultdict(set)
+    attached_containers = defaultdict(set)
+
+    for service in services:
+        vips = service.attrs.get("Endpoint", {}).get("VirtualIPs") or []
+        targets = service.attrs["Spec"].get("TaskTemplate", {}).get("Networks") or []
+
+        for network_id in [v["NetworkID"] for v in vips] + [network_ids.get(t["Target"], t["Target"]) for t in targets]:
+            attached_services[network_id].add(service.name)
+
+    for container in containers:
+        name = (container.attrs.get("Names") or [container.attrs.get("Name") or container.short_id])[0].lstrip("/")
+
+        for endpoint in (container.attrs.get("NetworkSettings") or {}).get("Networks", {}).values():
+            attached_containers[endpoint.get("NetworkID")].add(name)
+
+    for network in sorted(networks, key=lambda c: c.name):
+        yield {
+            "id": network.short_id,
+            "full_id": network.id,
+            "driver": network.attrs.get("Driver"),
+            "name": network.name,
+            "services": sorted(attached_services[network.id]),
+            "containers": sorted(attached_containers[network.id]),
+            "unused": not attached_services[network.id] and not attached_containers[network.id],
+            "removable": __is_removable(network.attrs)}
+
+
+def __is_removable(attrs):
+    """check whether a network can be removed, the predefined ones cannot"""
+    return attrs["Name"] not in ("bridge", "host", "none", "docker_gwbridge") and not attrs.get("Ingress")
 
 
 def __get_auto_complete_network():
-    __get_table()
+    rows = [r for r in get_rows() if r["unused"] and r["removable"]]
+
+    if len(rows) == 0:
+        console.print("no unused networks found")
+
+        questionary.press_any_key_to_continue("press any key to continue").ask()
+
+        return None
+
+    __get_table(rows=rows)
+
+    # names are not unique, networks sharing one are told apart by their id
+    names = Counter(r["name"] for r in rows)
+    network_ids = {r["name"] if names[r["name"]] == 1 else f"{r['name']} ({r['id']})": r["full_id"] for r in rows}
 
     network_name = questionary.autocomplete(
-        "select a network",
-        choices=__get_network_names(),
+        "select an unused network",
+        choices=list(network_ids),
         style=styles.autocomplete,
-        validate=lambda v: not v or v in __get_network_names()).ask()
+        validate=lambda v: not v or v in network_ids).ask()
 
     if not network_name:
         return None
 
-    return client.networks.get(network_name)
+    return client.networks.get(network_ids[network_name])
 
 
 def cmd_ls():
@@ -91,3 +159,41 @@ def cmd_rm():
 
     with console.status("removing network..."):
         network.remove()
+
+
+def cmd_rm_unused():
+    """remove all unused overlay networks"""
+    with console.status("loading networks..."):
+        rows = [r for r in get_rows() if r["unused"] and r["removable"] and r["driver"] == "overlay"]
+
+    if len(rows) == 0:
+        console.print("no unused overlay networks found")
+        questionary.press_any_key_to_continue("press any key to continue").ask()
+        return
+
+    __get_table(rows=rows)
+
+    answer = questionary.confirm(f"are you sure you want to remove these {len(rows)} networks?").ask()
+    if not answer:
+        return
+
+    with console.status("removing networks..."):
+        # swarm allows several networks with the same name, they are removed by id
+        errors = aio.gather(*(lambda network_id=r["full_id"]: __remove(network_id) for r in rows))
+
+    for row, error in zip(rows, errors):
+        if error:
+            console.print(f"[red]{row['name']}: {error}[/]")
+        else:
+            console.print(f"{row['name']} removed")
+
+    questionary.press_any_key_to_continue("press any key to continue").ask()
+
+
+def __remove(network_id):
+    """remove a network, get the error instead of raising it"""
+    try:
+        client.api.remove_network(network_id)
+        return None
+    except docker.errors.APIError as e:
+        return e.explanation or str(e)
@@ -1,35 +1,45 @@
 import concurrent.futures
+from collections import defaultdict
 from rich.console import Console
 from rich.table import Table
-import docker
 import questionary
 from command_handler import CommandHandler
+from inspect_view import InspectView
 from refresh import RefreshUntilKeyPressed
+from table_view import TableView
+import aio
+import backend
+import capacity
+import connections
+import drain
+import records
 import utils
+import snapshot
 import ssh
 import styles
 
 console = Console()
-client = docker.from_env()
+client = connections.client
 
 
 def start():
     """initial menu"""
+    return get_handler().start()
 
-    while True:
-        __show_header()
 
-        handler = CommandHandler()
-        handler.add_command("back", "go back", lambda: True)
-        handler.add_command("activate", "activate a node", cmd_activate)
-        handler.add_command("drain", "drain a node", cmd_drain)
-        handler.add_command("inspect", "inspect a node", cmd_inspect)
-        handler.add_command("ls", "list all nodes", cmd_ls)
-        handler.add_command("overview", "show an overview of all nodes", cmd_overview)
-        handler.add_command("prune", "Prune all nodes", cmd_prune)
+def get_handler():
+    """get the commands of the menu"""
+    handler = CommandHandler("nodes")
+    handler.add_back()
+    handler.add_command("activate", "activate nodes", cmd_activate)
+    handler.add_command("capacity", "show reserved and free resources of the nodes", cmd_capacity)
+    handler.add_command("drain", "drain nodes", cmd_drain)
+    handler.add_command("inspect", "inspect a node", cmd_inspect)
+    handler.add_command("ls", "list all nodes", cmd_ls)
+    handler.add_command("overview", "show an overview of all nodes", cmd_overview)
+    handler.add_command("prune", "Prune all nodes", cmd_prune)
 
-        if handler.show_command_chooser():
-            return False
+    return handler
 
 
 def __show_header():
@@ -43,25 +53,14 @@ def __get_table(availability=None, print_table=True):
     table.add_column("role")
     table.add_column("state")
 
-    for node in sorted(client.nodes.list(), key=lambda c: c.attrs.get("Description").get("Hostname")):
-        if availability and availability != node.attrs.get("Spec").get("Availability"):
-            continue
-
-        attrs = node.attrs
-        spec = attrs.get("Spec")
-        description = attrs.get("Description")
-        state = attrs.get("Status", {}).get("State")
-        av = spec.get("Availability")
-
-        color = "green" if state == "ready" and av == "active" else "red"
-
-        av = f"[{color}]{state}/{av}[/]"
+    for row in get_rows(availability=availability):
+        color = "green" if row["state"] == "ready" and row["availability"] == "active" else "red"
 
         table.add_row(
-            node.short_id,
-            description.get("Hostname"),
-            spec.get("Role"),
-            av)
+            row["id"],
+            row["host"],
+            row["role"],
+            f"[{color}]{row['state']}/{row['availability']}[/]")
 
     if print_table:
         console.print(table)
@@ -69,6 +68,20 @@ def __get_table(availability=None, print_table=True):
     return table
 
 
+def get_rows(availability=None):
+    """get the rows of the node table, one dict per node"""
+    for node in sorted(records.get_nodes(), key=lambda c: c.hostname):
+        if availability and availability != node.availability:
+            continue
+
+        yield {
+            "id": node.short_id,
+            "host": node.hostname,
+            "role": node.role,
+            "state": node.state,
+            "availability": node.availability}
+
+
 def __get_node_names(availability=None):
     nodes = client.nodes.list()
     node_names = []
@@ -106,29 +119,73 @@ def __get_auto_complete_node(availability=None):
 
 
 def cmd_activate():
-    """activate a node"""
-    node = __get_auto_complete_node("drain")
+    """activate nodes"""
+    __change_availability("drain", "active")
 
-    if not node:
-        return
 
-    with console.status("activating node..."):
-        node.update({
-            "Availability": "active",
-            "Role": node.attrs.get("Spec").get("Role")})
+def cmd_capacity():
+    """show reserved and free resources of the nodes"""
+    capacity.show_nodes(console)
 
 
 def cmd_drain():
-    """drain a node"""
-    node = __get_auto_complete_node("active")
+    """drain nodes"""
+    __change_availability("active", "drain")
 
-    if not node:
+
+def __change_availability(current, availability):
+    nodes = __select_nodes(current)
+
+    if not nodes:
         return
 
-    with console.status("draining node..."):
-        node.update({
-            "Availability": "drain",
-            "Role": node.attrs.get("Spec").get("Role")})
+    names = ", ".join(n.attrs["Description"]["Hostname"] for n in nodes)
+    answer = questionary.confirm(f"are you sure you want to {availability} {names}?").ask()
+    if not answer:
+        return
+
+    with console.status(f"setting nodes to {availability}..."):
+        monitor = drain.DrainMonitor(console, nodes, availability)
+        drain.set_availability(nodes, availability)
+
+    monitor.show()
+    questionary.press_any_key_to_continue("press any key to continue").ask()
+
+
+def __select_nodes(availability):
+    """select several nodes by name or label selector"""
+    nodes = [n for n in client.nodes.list() if n.attrs["Spec"]["Availability"] == availability]
+
+    if len(nodes) == 0:
+        console.print("no nodes found")
+        questionary.press_any_key_to_continue("press any key to continue").ask()
+
+        return None
+
+    __get_table(availability=availability)
+
+    selection = questionary.select("select nodes by", choices=["name", "label"]).ask()
+
+    if selection == "name":
+        names = questionary.checkbox(
+            "select nodes",
+            choices=sorted(n.attrs["Description"]["Hostname"] for n in nodes)).ask()
+
+        return [n for n in nodes if n.attrs["Description"]["Hostname"] in (names or [])]
+
+    if selection == "label":
+        selector = questionary.text("enter a label selector, e.g. zone=a,gpu").ask()
+        if not selector:
+            return None
+
+        selected = drain.select_by_label(nodes, selector)
+        if not selected:
+            console.print("no nodes match the selector")
+            questionary.press_any_key_to_continue("press any key to continue").ask()
+
+        return selected
+
+    return None
 
 
 def cmd_inspect():
@@ -138,8 +195,7 @@ def cmd_inspect():
     if not node:
         return
 
-    console.print(node.attrs)
-    questionary.press_any_key_to_continue("press any key to continue").ask()
+    InspectView(console, f"node {node.attrs['Description']['Hostname']}", node.attrs).show()
 
 
 def cmd_ls():
@@ -150,106 +206,139 @@ def cmd_ls():
 def cmd_overview():
     """show an overview of all nodes"""
 
-    stat_dic = {}
-
-    # no with statement because of concurrent.futures.ThreadPoolExecutor()
-    # it would wait for finishing the thread
-    stats_future = concurrent.futures.ThreadPoolExecutor().submit(__load_stats, stat_dic)
-
-    def go():
-        table = Table(expand=True)
-        table.add_column("node")
-        table.add_column("services")
-        table.add_column("stats")
-
-        services = sorted(client.services.list(), key=lambda s: s.name)
-
-        tasks = []
-        for service in services:
-            tasks.extend([task for task in service.tasks() if task["Status"]["State"] == "running"])
+    # a running backend already collects the stats
+    load_rows = backend.get_loader("node overview")
+    stats_future = None
+
+    if not load_rows:
+        stat_dic = {}
+        load_rows = lambda: get_overview_rows(stat_dic)
+
+        # no with statement because of concurrent.futures.ThreadPoolExecutor()
+        # it would wait for finishing the thread
+        stats_future = concurrent.futures.ThreadPoolExecutor().submit(load_stats, stat_dic)
+
+    def format_row(row):
+        if row["stats"] is None and stats_future and stats_future.running():
+            stats = "loading..."
+        else:
+            stats = __format_stats(row["stats"])
+
+        return [
+            row["node"],
+            "\n".join(row["services"]),
+            stats]
+
+    columns = [("node", "node"), ("services", "services"), ("stats", "stats")]
+
+    TableView(
+        console,
+        "nodes",
+        columns,
+        load_rows,
+        format_row,
+        cache_key="node overview").show()
+
+
+def get_overview_rows(stat_dic=None):
+    """
+    get the rows of the node overview, one dict per node
+
+    if no stat_dic with already loaded stats is passed, the stats
+    of each node are loaded via ssh before its row is returned
+    """
+    services, nodes, tasks = aio.gather(
+        records.get_services,
+        records.get_nodes,
+        lambda: records.get_tasks(filters={"desired-state": "running"}))
+
+    service_names = {s.id: s.name for s in services}
+
+    node_services = defaultdict(list)
+    for task in tasks:
+        if task.state == "running":
+            node_services[task.node_id].append(service_names.get(task.service_id, task.service_id))
+
+    for node in sorted(nodes, key=lambda c: c.hostname):
+        if snapshot.is_snapshot(client):
+            stats = None
+        elif stat_dic is None:
+            stats = __get_stats(node)
+        else:
+            stats = stat_dic.get(node.id)
+
+        services_arr = sorted(node_services[node.id])
+
+        yield {
+            "node": node.hostname,
+            "services": services_arr,
+            "stats": stats}
+
+
+def load_stats(dic):
+    """load the stats of all nodes via ssh into the dict, by node id"""
+    if snapshot.is_snapshot(client):
+        return
 
-        for node in sorted(client.nodes.list(), key=lambda c: c.attrs.get("Description").get("Hostname")):
-            attrs = node.attrs
-            hostname = attrs.get("Description").get("Hostname")
+    for node in records.get_nodes():
+        stats = __get_stats(node)
 
-            if stats_future.running():
-                stats = "loading..."
-            else:
-                stats = stat_dic.get(node.id, "not available")
+        if stats:
+            dic[node.id] = stats
 
-            node_tasks = [task for task in tasks if task["NodeID"] == node.id]
-            services_arr = []
-            for node_task in node_tasks:
-                service = next((s.name for s in services if s.id == node_task["ServiceID"]), None)
-                services_arr.append(service)
 
-            table.add_row(
-                hostname,
-                "\n".join(services_arr),
-                stats)
+def __get_stats(node):
+    stats_arr = ssh.execute_command(
+        node.ip,
+        [
+            ssh.Command("df -k | grep /$ | awk '{print $2 \"/\" $3 }'"),
+            ssh.Command("free --kilo | grep Mem | awk '{print $2 \"/\" $3 }'"),
+            ssh.Command("uptime -p")
+        ])
 
-        return table
+    if isinstance(stats_arr, str):
+        return {"error": stats_arr}
+    elif stats_arr and len(stats_arr) == 3:
+        disk_arr = stats_arr[0].partition("\n")[0].split("/")
+        mem_arr = stats_arr[1].partition("\n")[0].split("/")
 
-    RefreshUntilKeyPressed(console, __show_header, go)
+        return {
+            "uptime": stats_arr[2],
+            "disk_total": round(int(disk_arr[0]) / 1024 / 1024, 2),
+            "disk_used": round(int(disk_arr[1]) / 1024 / 1024, 2),
+            "mem_total": round(int(mem_arr[0]) / 1024 / 1024, 2),
+            "mem_used": round(int(mem_arr[1]) / 1024 / 1024, 2)}
 
+    return None
 
-def __get_node_ip(node):
-    attrs = node.attrs
 
-    node_ip = attrs.get("Status").get("Addr")
+def __format_stats(stats):
+    if not stats:
+        return "not available"
 
-    # leader
-    if node_ip == "0.0.0.0":
-        manager_status = attrs.get("ManagerStatus")
+    if "error" in stats:
+        return f"[red]{stats['error']}[/]"
 
-        if manager_status and manager_status.get("Leader"):
-            node_ip = manager_status.get("Addr")
-            node_ip = node_ip.partition(":")[0]
-    
-    return node_ip
+    disk_percent = round(stats["disk_used"] / stats["disk_total"] * 100, 2)
+    disk_color = "green" if disk_percent < 80 else "red"
 
-def __load_stats(dic):
-    for node in client.nodes.list():
-        node_ip = __get_node_ip(node)
+    mem_percent = round(stats["mem_used"] / stats["mem_total"] * 100, 2)
+    mem_color = "green" if mem_percent < 80 else "red"
 
-        stats_arr = ssh.execute_command(
-            node_ip,
-            [
-                ssh.Command("df -k | grep /$ | awk '{print $2 \"/\" $3 }'"),
-                ssh.Command("free --kilo | grep Mem | awk '{print $2 \"/\" $3 }'"),
-                ssh.Command("uptime -p")
-            ])
-        
-        if isinstance(stats_arr, str):
-            dic[node.id] = f"[red]{stats_arr}[/]"
-        elif stats_arr and len(stats_arr) == 3:
-            disk_arr = stats_arr[0].partition("\n")[0].split("/")
-            disk_total = round(int(disk_arr[0]) / 1024 / 1024, 2)
-            disk_used = round(int(disk_arr[1]) / 1024 / 1024, 2)
-            disk_percent = round(disk_used / disk_total * 100, 2)
-            disk_color = "green" if disk_percent < 80 else "red"
-
-            mem_arr = stats_arr[1].partition("\n")[0].split("/")
-            mem_total = round(int(mem_arr[0]) / 1024 / 1024, 2)
-            mem_used = round(int(mem_arr[1]) / 1024 / 1024, 2)
-            mem_percent = round(mem_used / mem_total * 100, 2)
-            mem_color = "green" if mem_percent < 80 else "red"
-
-            disk = f"disk: {disk_used}GB/{disk_total}GB [{disk_color}]({disk_percent}%)[/]"
-            mem = f"mem: {mem_used}GB/{mem_total}GB [{mem_color}]({mem_percent}%)[/]"
-            dic[node.id] = f"[orange3]{stats_arr[2]}[/]\n{disk}\n{mem}"
+    disk = f"disk: {stats['disk_used']}GB/{stats['disk_total']}GB [{disk_color}]({disk_percent}%)[/]"
+    mem = f"mem: {stats['mem_used']}GB/{stats['mem_total']}GB [{mem_color}]({mem_percent}%)[/]"
+    return f"[orange3]{stats['uptime']}[/]\n{disk}\n{mem}"
 
 def cmd_prune():
     """Prune all nodes"""
     if not questionary.confirm("Are you sure?").ask():
         return
 
-    for node in client.nodes.list():
-        node_ip = __get_node_ip(node)
-        hostname = node.attrs.get("Description").get("Hostname")
+    for node in records.get_nodes():
+        hostname = node.hostname
 
         result = ssh.execute_command(
-            node_ip,
+            node.ip,
             [
                 ssh.Command(
                     "docker system prune -f", 
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# a manager answering slower than this makes the refresh loops slow down
+TARGET_LATENCY = 0.2
+
+# the refresh loops slow down by at most this factor
+MAX_SLOWDOWN = 10
+
+
+class RateLimiter:
+    """
+    Token bucket limiting the requests to one docker endpoint
+
+    interactive requests may use all tokens; background requests
+    (refresh loops, pollers) leave a reserve for them and wait while
+    an interactive request is waiting; the latency of the answers is
+    tracked to slow down the refresh loops of a busy manager
+    """
+
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0:
+            raise ValueError(f"the rate limit must be more than 0 requests per second, not {rate}")
+
+        # at least one token, and background requests must be able to get one too
+        self.rate = rate
+        self.burst = max(int(burst), 1)
+        self.reserve = min(self.burst / 2, self.burst - 1)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.condition = threading.Condition()
+        self.waiting = 0
+        self.throttled_at = 0
+        self.latency = 0.0
+
+    def acquire(self, background: bool):
+        """take a token, waits until one is available for the priority"""
+        with self.condition:
+            while True:
+                self.__refill()
+                needed = 1 + (self.reserve if background else 0)
+
+                if self.tokens >= needed and not (background and self.waiting):
+                    self.tokens -= 1
+                    return
+
+                self.throttled_at = time.monotonic()
+
+                if not background:
+                    self.waiting += 1
+
+                try:
+                    self.condition.wait(max((needed - self.tokens) / self.rate, 0.01))
+                finally:
+                    if not background:
+                        self.waiting -= 1
+
+    def record(self, seconds: float):
+        """track the latency of an answer"""
+        self.latency = 0.8 * self.latency + 0.2 * seconds
+
+    def is_throttled(self):
+        """check whether requests had to wait within the last seconds"""
+        return time.monotonic() - self.throttled_at < 2
+
+    def get_slowdown(self):
+        """get the factor the refresh loops should slow down by"""
+        factor = max(self.latency / TARGET_LATENCY, 1)
+        if self.is_throttled():
+            factor *= 2
+
+        return min(factor, MAX_SLOWDOWN)
+
+    def __refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.tokens + (now - self.updated_at) * self.rate, self.burst)
+        self.updated_at = now
+
+
+__limiters = {}
+__local = threading.local()
+
+
+DEFAULT_RATE = 20.0
+
+
+def get_rate():
+    """get the requests per second set by DCLI_RATE_LIMIT, the default if it is invalid"""
+    try:
+        return float(os.getenv("DCLI_RATE_LIMIT", DEFAULT_RATE) or 0)
+    except ValueError:
+        return DEFAULT_RATE
+
+
+def get_burst(rate):
+    """get the burst set by DCLI_RATE_BURST, twice the rate if it is unset or invalid"""
+    try:
+        return int(os.getenv("DCLI_RATE_BURST") or rate * 2)
+    except ValueError:
+        return int(rate * 2)
+
+
+def install(api, name):
+    """
+    limit the requests of a docker api client, configured by
+    DCLI_RATE_LIMIT (requests per second, default 20, 0 or less disables it)
+    and DCLI_RATE_BURST (default twice the rate)
+    """
+    rate = get_rate()
+    if not rate > 0:
+        return
+
+    limiter = __limiters[name] = RateLimiter(rate, get_burst(rate))
+    request = api.request
+
+    def limited_request(method, url, *args, **kwargs):
+        limiter.acquire(is_background())
+        started_at = time.monotonic()
+
+        response = request(method, url, *args, **kwargs)
+
+        # streams stay open, their duration says nothing about the manager
+        if not kwargs.get("stream"):
+            limiter.record(time.monotonic() - started_at)
+
+        return response
+
+    api.request = limited_request
+
+
+def get(name) -> RateLimiter:
+    """get the limiter of an endpoint, None if it has none"""
+    return __limiters.get(name)
+
+
+def is_background():
+    """check whether the current thread sends background requests"""
+    return getattr(__local, "background", False)
+
+
+@contextmanager
+def background(enabled=True):
+    """send the requests of the current thread as background requests"""
+    previous = is_background()
+    __local.background = enabled
+
+    try:
+        yield
+    finally:
+        __local.background = previous
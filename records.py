@@ -0,0 +1,221 @@
+from dataclasses import dataclass
+import connections
+
+client = connections.client
+
+
+@dataclass(slots=True, frozen=True)
+class Resources:
+    """Cpus in nano cpus and memory in bytes, of a node or reserved or limited by a task"""
+
+    nano_cpus: int = 0
+    memory_bytes: int = 0
+
+    @classmethod
+    def from_attrs(cls, attrs):
+        """project a Resources, Reservations or Limits object"""
+        attrs = attrs or {}
+        return cls(attrs.get("NanoCPUs") or 0, attrs.get("MemoryBytes") or 0)
+
+    def __add__(self, other):
+        return Resources(self.nano_cpus + other.nano_cpus, self.memory_bytes + other.memory_bytes)
+
+    def __sub__(self, other):
+        return Resources(self.nano_cpus - other.nano_cpus, self.memory_bytes - other.memory_bytes)
+
+    def __mul__(self, count):
+        return Resources(self.nano_cpus * count, self.memory_bytes * count)
+
+    def __bool__(self):
+        return bool(self.nano_cpus or self.memory_bytes)
+
+
+@dataclass(slots=True, frozen=True)
+class TaskRecord:
+    """Fields of a task the views use"""
+
+    id: str
+    service_id: str
+    node_id: str
+    slot: int
+    updated_at: str
+    state: str
+    desired_state: str
+    error: str
+    image: str
+    force_update: int
+    reservations: Resources
+    limits: Resources
+    container_id: str
+
+    @classmethod
+    def from_attrs(cls, attrs):
+        """project the attrs of a task"""
+        status = attrs.get("Status") or {}
+        spec = attrs.get("Spec") or {}
+        resources = spec.get("Resources") or {}
+
+        return cls(
+            attrs["ID"],
+            attrs.get("ServiceID"),
+            attrs.get("NodeID"),
+            attrs.get("Slot"),
+            attrs.get("UpdatedAt"),
+            status.get("State"),
+            attrs.get("DesiredState", "unknown"),
+            status.get("Err"),
+            spec.get("ContainerSpec", {}).get("Image", ""),
+            spec.get("ForceUpdate", 0),
+            Resources.from_attrs(resources.get("Reservations")),
+            Resources.from_attrs(resources.get("Limits")),
+            (status.get("ContainerStatus") or {}).get("ContainerID"))
+
+
+@dataclass(slots=True, frozen=True)
+class ServiceRecord:
+    """Fields of a service the views use"""
+
+    id: str
+    name: str
+    image: str
+    force_update: int
+    replicas: int
+    is_global: bool
+    update_state: str
+    update_message: str
+    network_ids: tuple[str, ...]
+    ports: tuple[tuple[int, int, str], ...]
+    reservations: Resources
+    limits: Resources
+
+    @property
+    def short_id(self):
+        """get the id shortened to 12 characters, like the docker sdk and cli do"""
+        return self.id[:12]
+
+    @classmethod
+    def from_attrs(cls, attrs):
+        """project the attrs of a service"""
+        spec = attrs["Spec"]
+        task_template = spec.get("TaskTemplate", {})
+        mode = spec.get("Mode", {})
+        update_status = attrs.get("UpdateStatus") or {}
+        endpoint = attrs.get("Endpoint") or {}
+        resources = task_template.get("Resources") or {}
+
+        return cls(
+            attrs["ID"],
+            spec["Name"],
+            task_template.get("ContainerSpec", {}).get("Image", ""),
+            task_template.get("ForceUpdate", 0),
+            (mode.get("Replicated") or mode.get("Global") or {}).get("Replicas", 0),
+            "Global" in mode,
+            update_status.get("State", ""),
+            update_status.get("Message"),
+            tuple(v["NetworkID"] for v in endpoint.get("VirtualIPs") or []),
+            tuple(
+                (p.get("PublishedPort"), p.get("TargetPort"), p.get("Protocol"))
+                for p in endpoint.get("Ports") or []),
+            Resources.from_attrs(resources.get("Reservations")),
+            Resources.from_attrs(resources.get("Limits")))
+
+
+@dataclass(slots=True, frozen=True)
+class NodeRecord:
+    """Fields of a node the views use"""
+
+    id: str
+    hostname: str
+    role: str
+    availability: str
+    state: str
+    ip: str
+    resources: Resources
+
+    @property
+    def short_id(self):
+        """get the id shortened to 12 characters, like the docker sdk and cli do"""
+        return self.id[:12]
+
+    @classmethod
+    def from_attrs(cls, attrs):
+        """project the attrs of a node"""
+        spec = attrs.get("Spec") or {}
+        status = attrs.get("Status") or {}
+        ip = status.get("Addr")
+
+        # the leader reports 0.0.0.0, its address is in the manager status
+        manager_status = attrs.get("ManagerStatus") or {}
+        if ip == "0.0.0.0" and manager_status.get("Leader"):
+            ip = manager_status.get("Addr", "").partition(":")[0]
+
+        description = attrs.get("Description") or {}
+
+        return cls(
+            attrs["ID"],
+            description.get("Hostname"),
+            spec.get("Role"),
+            spec.get("Availability"),
+            status.get("State"),
+            ip,
+            Resources.from_attrs(description.get("Resources")))
+
+
+@dataclass(slots=True, frozen=True)
+class ContainerRecord:
+    """Fields of a container the views use"""
+
+    id: str
+    name: str
+    image: str
+    networks: tuple
+    ports: tuple
+    started_at: str
+    status: str
+
+    @property
+    def short_id(self):
+        """get the id shortened to 12 characters, like the docker sdk and cli do"""
+        return self.id[:12]
+
+    @classmethod
+    def from_attrs(cls, attrs):
+        """project the inspect attrs of a container, ports as 'host ports -> port/protocol'"""
+        network_settings = attrs.get("NetworkSettings") or {}
+        state = attrs.get("State") or {}
+
+        return cls(
+            attrs["Id"],
+            attrs.get("Name", "").lstrip("/"),
+            (attrs.get("Config") or {}).get("Image"),
+            tuple(network_settings.get("Networks") or {}),
+            tuple(
+                f"{', '.join(set(b['HostPort'] for b in bindings))} -> {port}"
+                for port, bindings in (network_settings.get("Ports") or {}).items() if bindings),
+            state.get("StartedAt"),
+            state.get("Status"))
+
+
+def get_tasks(filters=None):
+    """get the tasks matching the filters as records"""
+    return [TaskRecord.from_attrs(t) for t in client.api.tasks(filters=filters)]
+
+
+def get_services(filters=None):
+    """get the services matching the filters as records"""
+    return [ServiceRecord.from_attrs(s) for s in client.api.services(filters=filters)]
+
+
+def get_nodes(filters=None):
+    """get the nodes matching the filters as records"""
+    return [NodeRecord.from_attrs(n) for n in client.api.nodes(filters=filters)]
+
+
+def get_containers(filters=None):
+    """
+    get the containers matching the filters as records
+
+    the start time is only in the inspect attrs, so the containers are
+    listed with them, but only the records are kept
+    """
+    return [ContainerRecord.from_attrs(c.attrs) for c in client.containers.list(filters=filters)]
@@ -4,6 +4,8 @@ from threading import Event
 import concurrent.futures
 from rich.console import Console
 from rich.live import Live
+import connections
+import ratelimit
 
 class RefreshUntilKeyPressed:
     """Call for repeating an action until a key is pressed"""
@@ -43,9 +45,10 @@ class RefreshUntilKeyPressed:
         self.header_callback()
         self.console.print("Press [orange3]Enter-Key[/] to exit or [orange3]s + Enter-Key[/] to stop refreshing.", style="bold")
 
-        with Live(self.callback(), console=self.console, auto_refresh=False) as live:
+        with ratelimit.background(), Live(self.callback(), console=self.console, auto_refresh=False) as live:
             while not self.event.is_set():
-                sleep(1)
+                limiter = ratelimit.get(connections.get_active())
+                sleep(limiter.get_slowdown() if limiter else 1)
 
                 if self.event.is_set():
                     break
@@ -0,0 +1,211 @@
+import atexit
+import concurrent.futures
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+import docker
+import paramiko
+from docker.transport import SSHHTTPAdapter
+import connections
+import ssh
+
+# seconds between ssh keepalive packets, so idle connections are not dropped by firewalls
+KEEPALIVE = 30
+
+# not more connections per node than the aio executor runs calls
+POOL_SIZE = connections.POOL_SIZE
+
+
+class NodeSSHAdapter(SSHHTTPAdapter):
+    """
+    Docker api over ssh to a node, authenticated like the ssh commands
+
+    the docker sdk only reads ~/.ssh/config, the key, passphrase and
+    password from SSH_KEY_FILE, SSH_KEY_PASSWORD and SSH_PWD are added;
+    like the ssh commands, unknown host keys are accepted
+    """
+
+    def __init__(self, base_url, connect_kwargs, **kwargs):
+        self.connect_kwargs = connect_kwargs
+        super().__init__(base_url, **kwargs)
+
+    def _create_paramiko_client(self, base_url):
+        super()._create_paramiko_client(base_url)
+        self.ssh_params.update(self.connect_kwargs)
+        self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+    def _connect(self):
+        super()._connect()
+        self.ssh_client.get_transport().set_keepalive(KEEPALIVE)
+
+    def is_active(self):
+        """check whether the ssh connection is still open"""
+        transport = self.ssh_client.get_transport()
+        return transport is not None and transport.is_active()
+
+
+def get_idle_timeout():
+    """get the seconds an unused node connection is kept open, set by DCLI_NODE_IDLE_TIMEOUT"""
+    timeout = os.getenv("DCLI_NODE_IDLE_TIMEOUT", "600")
+    return int(timeout) if timeout.isdigit() else 600
+
+
+__futures = {}
+__used_at = {}
+__busy = Counter()
+__timer = None
+__lock = threading.Lock()
+__executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+
+def get_local_node_id():
+    """get the id of the node of the active endpoint"""
+    return (connections.client.info().get("Swarm") or {}).get("NodeID")
+
+
+def is_local(node, local_node_id=None):
+    """check whether the node is the one of the active endpoint, local_node_id is looked up if not given"""
+    return node.id == (local_node_id or get_local_node_id())
+
+
+def warm(node, local_node_id=None):
+    """start connecting to a node in the background, if it has no open connection"""
+    if not is_local(node, local_node_id):
+        __get_future(node.ip)
+
+
+def get_client(node, local_node_id=None):
+    """
+    get a docker client of a node, the one of the active endpoint for its own node
+
+    the clients of other nodes connect via ssh on first use and are
+    kept open, so later calls on the same node don't connect again;
+    clients unused for the idle timeout are closed
+    """
+    if is_local(node, local_node_id):
+        return connections.client
+
+    node_client, _ = __get_future(node.ip).result()
+    return node_client
+
+
+@contextmanager
+def keep_open(node):
+    """keep the client of a node open while the block runs, e.g. during an exec session"""
+    with __lock:
+        __busy[node.ip] += 1
+
+    try:
+        yield
+    finally:
+        with __lock:
+            __busy[node.ip] -= 1
+            __used_at[node.ip] = time.monotonic()
+            __schedule_close_idle()
+
+
+def close_all():
+    """close the connections to all nodes, called at exit"""
+    with __lock:
+        futures = list(__futures.values())
+        __futures.clear()
+        __used_at.clear()
+
+        if __timer:
+            __timer.cancel()
+
+    for future in futures:
+        __close(future)
+
+    __executor.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(close_all)
+
+
+def __get_future(host):
+    with __lock:
+        __close_idle()
+
+        future = __futures.get(host)
+
+        # a failed or dropped connection is made again
+        if future and future.done() and (future.exception() or not future.result()[1].is_active()):
+            __close(future)
+            future = None
+
+        if future is None:
+            future = __futures[host] = __executor.submit(__connect, host)
+
+        __used_at[host] = time.monotonic()
+        __schedule_close_idle()
+
+        return future
+
+
+def __close_idle():
+    """close the clients unused for the idle timeout, called with the lock held"""
+    timeout = get_idle_timeout()
+
+    for host, used_at in list(__used_at.items()):
+        if time.monotonic() - used_at > timeout and not __busy[host]:
+            del __used_at[host]
+            future = __futures.pop(host, None)
+
+            if future:
+                __close(future)
+
+
+def __schedule_close_idle():
+    """
+    start a timer closing the least recently used client once it is idle,
+    called with the lock held; so clients are closed without a later call
+    """
+    global __timer
+
+    if __timer:
+        __timer.cancel()
+
+    idle = [used_at for host, used_at in __used_at.items() if not __busy[host]]
+    if not idle:
+        __timer = None
+        return
+
+    delay = min(idle) + get_idle_timeout() - time.monotonic()
+    __timer = threading.Timer(max(delay, 0) + 0.1, __run_close_idle)
+    __timer.daemon = True
+    __timer.start()
+
+
+def __run_close_idle():
+    with __lock:
+        __close_idle()
+        __schedule_close_idle()
+
+
+def __close(future):
+    if future.done() and not future.exception():
+        node_client, _ = future.result()
+        node_client.close()
+
+
+def __connect(host):
+    user, connect_kwargs = ssh.get_connect_kwargs()
+    base_url = f"ssh://{user}@{host}"
+
+    # created shelling out to ssh, which connects lazily, then the adapter is replaced
+    # by one using paramiko with the credentials of the ssh commands; the api version
+    # of the manager is used, the engines of a swarm are expected to match
+    node_client = docker.DockerClient(
+        base_url=base_url,
+        version=connections.client.api.api_version,
+        use_ssh_client=True,
+        max_pool_size=POOL_SIZE)
+
+    adapter = NodeSSHAdapter(base_url, connect_kwargs, max_pool_size=POOL_SIZE)
+    node_client.api.mount("http+docker://ssh", adapter)
+
+    # the adapter is kept with the client, to tell whether its connection dropped
+    return node_client, adapter
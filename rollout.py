@@ -0,0 +1,276 @@
+import os
+import time
+from contextlib import nullcontext
+from threading import Event, Thread
+from rich.console import Console, Group
+from rich.live import Live
+from rich.markup import escape
+from rich.table import Table
+from rich.text import Text
+import aio
+import connections
+import ratelimit
+import records
+import terminal
+import utils
+
+client = connections.client
+
+HELP = "[orange3]q/Enter[/] stop watching, the rollout continues in the swarm"
+
+# update states of a service that are still in progress
+ACTIVE_STATES = ("updating", "paused", "rollback_started", "rollback_paused")
+
+# phases the monitor stops at, a rolled back service is reported afterwards
+DONE_PHASES = ("converged", "rolled back")
+
+
+def get_poll_interval():
+    """get the seconds between full refreshes without events, set by DCLI_ROLLOUT_POLL"""
+    interval = os.getenv("DCLI_ROLLOUT_POLL", "3")
+    return float(interval) if interval.replace(".", "", 1).isdigit() else 3.0
+
+
+class ServiceRollout:
+    """
+    Progress of the rollout of one service
+
+    a task counts as updated if it runs with the current image and
+    force update counter of the service; the time spent in each
+    update state is summed up as long as it is watched
+    """
+
+    def __init__(self, service_id, name, started_at):
+        self.service_id = service_id
+        self.name = name
+        self.started_at = started_at
+        self.updated = 0
+        self.updated_at_start = None
+        self.running = 0
+        self.total = 0
+        self.failures = 0
+        self.state = None
+        self.message = None
+        self.phase = None
+        self.phase_started_at = started_at
+        self.phases = {}
+
+    def update(self, service, tasks, now):
+        """update the progress from the service record and all its task records"""
+        current = [t for t in tasks if t.desired_state == "running"]
+        running = [t for t in current if t.state == "running"]
+
+        self.state = service.update_state or None
+        self.message = service.update_message
+        self.running = len(running)
+        self.total = len(current) if service.is_global else service.replicas
+        self.updated = sum(1 for t in running if t.image == service.image and t.force_update == service.force_update)
+        self.failures = sum(
+            1 for t in tasks
+            if t.state in ("failed", "rejected") and utils.parse_timestamp(t.updated_at) >= self.started_at)
+
+        if self.updated_at_start is None:
+            self.updated_at_start = self.updated
+
+        self.__set_phase(self.get_phase(), now)
+
+    def get_phase(self):
+        """get the update state, rolled back, or converging/converged for changes without rolling update"""
+        if self.state in ACTIVE_STATES:
+            return self.state
+        if self.is_settled():
+            return "rolled back" if self.is_rollback() else "converged"
+
+        return "converging"
+
+    def is_settled(self):
+        """check whether all tasks run the current spec and no update is in progress"""
+        return self.state not in ACTIVE_STATES and self.updated == self.total == self.running
+
+    def is_converged(self):
+        """check whether the tasks settled without the update being rolled back"""
+        return self.is_settled() and not self.is_rollback()
+
+    def is_rollback(self):
+        """check whether the update is or was rolled back"""
+        return (self.state or "").startswith("rollback")
+
+    def get_eta(self, now):
+        """estimate the seconds until all tasks are updated, None without progress yet"""
+        done = self.updated - (self.updated_at_start or 0)
+        remaining = self.total - self.updated
+
+        if remaining <= 0:
+            return 0
+        if done <= 0:
+            return None
+
+        return remaining * (now - self.started_at) / done
+
+    def get_phase_times(self, now):
+        """get the seconds spent per phase, including the current one"""
+        phases = dict(self.phases)
+        if self.phase:
+            phases[self.phase] = phases.get(self.phase, 0) + now - self.phase_started_at
+
+        return phases
+
+    def __set_phase(self, phase, now):
+        if phase == self.phase:
+            return
+
+        if self.phase:
+            self.phases[self.phase] = self.phases.get(self.phase, 0) + now - self.phase_started_at
+
+        self.phase = phase
+        self.phase_started_at = now
+
+
+class RolloutMonitor:
+    """
+    Follows the rollout of services until all of them converged
+
+    the services and their tasks are fetched again whenever the event
+    stream reports a change of one of them (service updates and the
+    containers of their tasks on the connected node); tasks on other
+    nodes send no events, so they are polled every few seconds
+    """
+
+    def __init__(self, console: Console, services):
+        started_at = time.time()
+
+        self.console = console
+        self.rollouts = {s.id: ServiceRollout(s.id, s.name, started_at) for s in services}
+        self.changed = Event()
+        self.stopped = Event()
+        self.events = None
+        self.events_error = None
+        self.error = None
+
+    def show(self):
+        """show the progress until all services converged or the user stops watching"""
+        thread = Thread(target=self.__run_events, daemon=True)
+        thread.start()
+
+        interactive = terminal.is_interactive()
+        poll_interval = get_poll_interval()
+        refreshed_at = 0
+
+        try:
+            with terminal.raw_mode() if interactive else nullcontext(), \
+                    Live(console=self.console, auto_refresh=False) as live:
+                while True:
+                    # bursts of events are handled by one refresh
+                    if time.time() - refreshed_at >= poll_interval or \
+                            (self.changed.is_set() and time.time() - refreshed_at >= 0.5):
+                        self.changed.clear()
+                        refreshed_at = time.time()
+                        self.__refresh()
+
+                    live.update(self.__render(), refresh=True)
+
+                    if all(r.phase in DONE_PHASES for r in self.rollouts.values()):
+                        break
+
+                    key = terminal.read_key(timeout=0.2) if interactive else time.sleep(0.2)
+                    if key in ("q", "enter", "escape"):
+                        break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stopped.set()
+
+            if self.events:
+                self.events.close()
+
+        for rollout in self.rollouts.values():
+            if rollout.phase == "rolled back":
+                message = f": {escape(rollout.message)}" if rollout.message else ""
+                self.console.print(f"[red]the update of [orange3]{rollout.name}[/] was rolled back{message}[/]")
+
+    def __refresh(self):
+        ids = list(self.rollouts)
+
+        try:
+            with ratelimit.background():
+                services, tasks = aio.gather(
+                    lambda: records.get_services(filters={"id": ids}),
+                    lambda: records.get_tasks(filters={"service": ids}))
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+            return
+
+        now = time.time()
+        for service in services:
+            rollout = self.rollouts.get(service.id)
+            if rollout:
+                rollout.update(service, [t for t in tasks if t.service_id == service.id], now)
+
+    def __run_events(self):
+        try:
+            self.events = client.events(
+                decode=True,
+                since=int(time.time()),
+                filters={"type": ["service", "container"]})
+
+            for event in self.events:
+                if self.stopped.is_set():
+                    break
+
+                attributes = event.get("Actor", {}).get("Attributes", {})
+                service_id = event["Actor"].get("ID") if event.get("Type") == "service" \
+                    else attributes.get("com.docker.swarm.service.id")
+
+                if service_id in self.rollouts:
+                    self.changed.set()
+
+            if not self.stopped.is_set():
+                self.events_error = "event stream closed"
+        except Exception as e:
+            if not self.stopped.is_set():
+                self.events_error = str(e)
+
+    def __render(self):
+        now = time.time()
+
+        table = Table(expand=True)
+        table.add_column("service")
+        table.add_column("phase")
+        table.add_column("updated", justify="right")
+        table.add_column("running", justify="right")
+        table.add_column("failures", justify="right")
+        table.add_column("time per phase")
+        table.add_column("eta", justify="right")
+
+        for rollout in self.rollouts.values():
+            phase = rollout.phase or "waiting"
+            color = "red" if rollout.is_rollback() else "green" if rollout.is_converged() else "orange3"
+            eta = rollout.get_eta(now)
+
+            table.add_row(
+                rollout.name,
+                f"[{color}]{phase}[/]" + (f"\n[grey50]{escape(rollout.message)}[/]" if rollout.message else ""),
+                f"{rollout.updated}/{rollout.total}",
+                str(rollout.running),
+                f"[red]{rollout.failures}[/]" if rollout.failures else "0",
+                ", ".join(f"{p} {self.__format_seconds(s)}" for p, s in rollout.get_phase_times(now).items()),
+                "" if eta is None else self.__format_seconds(eta))
+
+        status = f"watching for {self.__format_seconds(now - min(r.started_at for r in self.rollouts.values()))}"
+        if self.events_error:
+            status += f"  [red]{self.events_error}, polling every {get_poll_interval():g}s[/]"
+        if self.error:
+            status += f"  [red]{self.error}[/]"
+
+        return Group(utils.get_header("rollout"), Text.from_markup(HELP), Text.from_markup(status), table)
+
+    @staticmethod
+    def __format_seconds(seconds):
+        seconds = int(seconds)
+        return f"{seconds // 60}m{seconds % 60:02d}s" if seconds >= 60 else f"{seconds}s"
+
+
+def monitor(console: Console, services):
+    """follow the rollout of the services until they converged"""
+    RolloutMonitor(console, services).show()
@@ -9,4 +9,4 @@ cd $p
 echo "$(pwd)"
 
 source env/bin/activate
-python3.12 main.py
+python3.12 main.py "$@"
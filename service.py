@@ -1,83 +1,78 @@
+import heapq
+import os
+from collections import Counter
 from rich.console import Console
 from rich.table import Table
-import docker
 import questionary
 from command_handler import CommandHandler
-from refresh import RefreshUntilKeyPressed
+from inspect_view import InspectView
+from table_view import TableView
+import aio
+import backend
+import capacity
+import connections
+import container
+import logexport
+import records
+import rollout
 import utils
 import styles
 
 console = Console()
-client = docker.from_env()
+client = connections.client
 
 
 def start():
     """initial menu"""
-
-    while True:
-        __show_header()
-
-        handler = CommandHandler()
-        handler.add_command("back", "go back", lambda: True)
-        handler.add_command("inspect", "inspect a service", cmd_inspect)
-        handler.add_command("logs", "show logs of a service", cmd_logs)
-        handler.add_command("ls", "list all services", cmd_ls)
-        handler.add_command("rm", "remove a service", cmd_rm)
-        handler.add_command("scale", "scale a service", cmd_scale)
-        handler.add_command("tag", "change tag of a service image", cmd_tag)
-        handler.add_command("tasks", "show tasks of a service", cmd_tasks)
-        handler.add_command("update", "force update a service", cmd_update)
-
-        if handler.show_command_chooser():
-            return False
-
-
-def __show_header():
-    utils.header("services")
+    return get_handler().start()
+
+
+def get_handler():
+    """get the commands of the menu"""
+    handler = CommandHandler("services")
+    handler.add_back()
+    handler.add_command("capacity", "show reservations and whether one more replica fits", cmd_capacity)
+    handler.add_command("export logs", "export logs of services to compressed files", cmd_export_logs)
+    handler.add_command("inspect", "inspect a service", cmd_inspect)
+    handler.add_command("logs", "show logs of a service", cmd_logs)
+    handler.add_command("ls", "list all services", cmd_ls)
+    handler.add_command("ls all", "list services of all clusters", cmd_ls_all)
+    handler.add_command("rm", "remove a service", cmd_rm)
+    handler.add_command("scale", "scale a service", cmd_scale)
+    handler.add_command("tag", "change tag of a service image", cmd_tag)
+    handler.add_command("task", "exec, logs or stats of a task on its node", cmd_task)
+    handler.add_command("tasks", "show tasks of a service", cmd_tasks)
+    handler.add_command("update", "force update a service", cmd_update)
+
+    return handler
+
+
+__columns = [
+    ("id", "id"),
+    ("name", "name"),
+    ("tag", "tag"),
+    ("networks", "networks"),
+    ("ports", "ports"),
+    ("replicas", "running"),
+    ("update status", "update_status")]
+
+__task_columns = [
+    ("updated at", "updated_at"),
+    ("node", "node"),
+    ("service", "service"),
+    ("tag", "tag"),
+    ("current state", "state"),
+    ("desired state", "desired_state"),
+    ("error", "error")]
 
 
 def __get_table(print_table=True):
     table = Table(expand=True)
-    table.add_column("id")
-    table.add_column("name")
-    table.add_column("tag")
-    table.add_column("networks")
-    table.add_column("ports")
-    table.add_column("replicas")
-    table.add_column("update status")
-
-    for service in sorted(client.services.list(), key=lambda c: c.name):
-        attrs = service.attrs
-
-        spec = attrs["Spec"]
-        mode = spec["Mode"]
-
-        tag = spec["TaskTemplate"]["ContainerSpec"]["Image"].split(":", 1)[1]
-        tag = tag.split("@", 1)[0]
+    for title, _ in __columns:
+        table.add_column(title)
 
-        replicated = mode.get("Replicated") or mode.get("Global")
-        replicas = replicated["Replicas"] if replicated else 0
-
-        update_status = attrs.get("UpdateStatus")
-        update_status_state = update_status["State"] if update_status else ""
-
-        endpoint = attrs["Endpoint"]
-
-        running_tasks = 0
-        for task in service.tasks():
-            if task["Status"]["State"] == "running":
-                running_tasks += 1
-
-        color = "green" if running_tasks == replicas else "red"
-
-        table.add_row(
-            service.short_id,
-            service.name,
-            tag,
-            __get_networks(endpoint),
-            __get_ports(endpoint),
-            f"[{color}]{running_tasks}/{replicas}[/]",
-            update_status_state)
+    for row in get_rows():
+        table.add_row(*__format_row(row))
 
     if print_table:
         console.print(table)
@@ -85,38 +80,75 @@ def __get_table(print_table=True):
     return table
 
 
-def __get_networks(endpoint):
-    virtual_ips = endpoint.get("VirtualIPs")
+def __format_row(row):
+    color = "green" if row["running"] == row["replicas"] else "red"
 
-    if not virtual_ips:
-        return ""
+    return [
+        row["id"],
+        row["name"],
+        row["tag"],
+        "\n".join(row["networks"]),
+        "\n".join(row["ports"]),
+        f"[{color}]{row['running']}/{row['replicas']}[/]",
+        row["update_status"]]
 
-    networks = []
-
-    for virtual_ip in virtual_ips:
-        network_id = virtual_ip["NetworkID"]
-        network = client.networks.get(network_id)
 
-        if network.name == "ingress":
-            continue
+def get_rows():
+    """get the rows of the service table, one dict per service"""
+    services, networks, tasks = aio.gather(
+        records.get_services,
+        client.networks.list,
+        lambda: records.get_tasks(filters={"desired-state": "running"}))
 
-        networks.append(network.name)
+    network_names = {n.id: n.name for n in networks}
 
-    return "\n".join(networks)
+    running_tasks = Counter(t.service_id for t in tasks if t.state == "running")
 
+    for service in sorted(services, key=lambda c: c.name):
+        tag = service.image.split(":", 1)[1]
+        tag = tag.split("@", 1)[0]
 
-def __get_ports(endpoint):
-    ports = endpoint.get("Ports")
+        yield {
+            "id": service.short_id,
+            "name": service.name,
+            "tag": tag,
+            "networks": __get_networks(service.network_ids, network_names),
+            "ports": [f"{published} -> {target}/{protocol}" for published, target, protocol in service.ports],
+            "running": running_tasks[service.id],
+            "replicas": service.replicas,
+            "update_status": service.update_state}
+
+
+def get_rows_all_clusters():
+    """get the rows of the service table of all clusters, queried concurrently"""
+    for cluster, rows, error in connections.query_all(lambda: list(get_rows())):
+        if error:
+            rows = [{
+                "id": "",
+                "name": "",
+                "tag": "",
+                "networks": [],
+                "ports": [],
+                "running": 0,
+                "replicas": 0,
+                "update_status": f"error: {error}"}]
+
+        for row in rows:
+            yield {"cluster": cluster, **row}
+
+
+def __get_networks(network_ids, network_names):
+    networks = []
 
-    if not ports:
-        return ""
+    for network_id in network_ids:
+        network_name = network_names.get(network_id, network_id)
 
-    port_info = []
+        if network_name == "ingress":
+            continue
 
-    for port in ports:
-        port_info.append(f"{port['PublishedPort']} -> {port['TargetPort']}/{port['Protocol']}")
+        networks.append(network_name)
 
-    return "\n".join(port_info)
+    return networks
 
 
 def __get_service_names():
@@ -155,14 +187,35 @@ def __get_auto_complete_service(allow_multiple=False):
     if not service_name:
         return None
 
-    if service_name == "all":
-        return client.services.list()
-    elif allow_multiple:
-        return [s for s in client.services.list() if s.name.startswith(service_name)]
+    if allow_multiple:
+        return find_services(service_name)
     else:
         return client.services.get(service_name)
 
 
+def find_services(pattern):
+    """get all services or the ones whose name starts with the pattern"""
+    if pattern == "all":
+        return client.services.list()
+
+    return [s for s in client.services.list() if s.name.startswith(pattern)]
+
+
+def cmd_capacity():
+    """show reservations of the services and whether one more replica fits"""
+    capacity.show_services(console)
+
+
+def cmd_export_logs():
+    """export logs of services to compressed files, one per service"""
+    services = __get_auto_complete_service(allow_multiple=True)
+
+    if not services:
+        return
+
+    logexport.ask_and_export(console, services)
+
+
 def cmd_inspect():
     """Inspect a service"""
     service = __get_auto_complete_service()
@@ -170,8 +223,7 @@ def cmd_inspect():
     if not service:
         return
 
-    console.print(service.attrs)
-    questionary.press_any_key_to_continue("press any key to continue").ask()
+    InspectView(console, f"service {service.name}", service.attrs).show()
 
 
 def cmd_logs():
@@ -194,7 +246,18 @@ def cmd_logs():
 
 def cmd_ls():
     """list all services"""
-    RefreshUntilKeyPressed(console, __show_header, lambda: __get_table(print_table=False))
+    load_rows = backend.get_loader("service ls") or get_rows
+    TableView(console, "services", __columns, load_rows, __format_row, cache_key="service ls").show()
+
+
+def cmd_ls_all():
+    """list services of all clusters"""
+    TableView(
+        console,
+        "services of all clusters",
+        [("cluster", "cluster")] + __columns,
+        get_rows_all_clusters,
+        lambda row: [row["cluster"]] + __format_row(row)).show()
 
 
 def cmd_rm():
@@ -220,13 +283,30 @@ def cmd_scale():
         default="1",
         validate=lambda v: v.isdigit() and int(v) > 0).ask()
 
+    if not replicas:
+        return
+
+    with console.status("checking capacity..."):
+        warnings = list(capacity.check_scale(services, int(replicas)))
+
+    for warning in warnings:
+        console.print(f"[red]warning:[/] {warning}")
+
+    if warnings and not questionary.confirm("scale anyway?").ask():
+        return
+
     for service in services:
         with console.status(f"scaling service [orange3]{service.name}[/]..."):
-            service.scale(int(replicas))
+            scale(service, int(replicas))
 
         console.print(f"  service [orange3]{service.name}[/] scaled")
 
-    cmd_tasks(services)
+    rollout.monitor(console, services)
+
+
+def scale(service, replicas):
+    """scale a service to the given number of replicas"""
+    service.scale(replicas)
 
 
 def cmd_tag():
@@ -249,7 +329,57 @@ def cmd_tag():
 
         console.print(f"  service [orange3]{service.name}[/] tagged")
 
-    cmd_tasks(services)
+    rollout.monitor(console, services)
+
+
+def cmd_task():
+    """exec, logs or stats of a task's container on its node"""
+    # imported here, as it loads paramiko and the ssh transport of the sdk
+    import remote
+
+    service = __get_auto_complete_service()
+
+    if not service:
+        return
+
+    with console.status("getting tasks..."):
+        nodes, tasks, local_node_id = aio.gather(
+            records.get_nodes,
+            lambda: records.get_tasks(filters={"service": service.id, "desired-state": "running"}),
+            remote.get_local_node_id)
+
+    nodes = {n.id: n for n in nodes}
+    tasks = sorted((t for t in tasks if t.container_id and t.node_id in nodes), key=lambda t: t.slot or 0)
+
+    if not tasks:
+        console.print("no running tasks found")
+        questionary.press_any_key_to_continue("press any key to continue").ask()
+        return
+
+    task = questionary.select(
+        "select a task",
+        choices=[questionary.Choice(
+            f"{service.name}.{t.slot or t.node_id[:10]} on {nodes[t.node_id].hostname} ({t.state})", value=t)
+            for t in tasks]).ask()
+
+    if not task:
+        return
+
+    node = nodes[task.node_id]
+
+    # connects while the action is selected, an open connection is reused
+    remote.warm(node, local_node_id)
+
+    action = questionary.select("open", choices=["exec", "logs", "stats"]).ask()
+    if not action:
+        return
+
+    # not closed as idle while the exec session or logs are open
+    with remote.keep_open(node):
+        with console.status(f"connecting to [orange3]{node.hostname}[/]..."):
+            task_container = remote.get_client(node, local_node_id).containers.get(task.container_id)
+
+        {"exec": container.run_exec, "logs": container.show_logs, "stats": container.show_stats}[action](task_container)
 
 
 def cmd_tasks(services=None):
@@ -259,57 +389,76 @@ def cmd_tasks(services=None):
     if not services:
         return
 
-    def go():
-        table = Table(expand=True)
-        table.add_column("updated at")
-        table.add_column("node")
-        table.add_column("service")
-        table.add_column("tag")
-        table.add_column("current state")
-        table.add_column("desired state")
-        table.add_column("error")
+    TableView(console, "services", __task_columns, lambda: get_task_rows(services), __format_task_row).show()
+
+
+def __format_task_row(row):
+    color = "green" if row["state"] == row["desired_state"] else "red"
 
-        services_and_tasks = [(s, t) for s in services for t in s.tasks()]
-        services_and_tasks = sorted(services_and_tasks, key=lambda t: t[1]["UpdatedAt"], reverse=True)
-        nodes = client.nodes.list()
+    return [
+        utils.format_date_time(row["updated_at"]),
+        row["node"],
+        row["service"],
+        row["tag"],
+        f"[{color}]{row['state']}[/]",
+        row["desired_state"],
+        row["error"]]
 
-        index = 0
-        for service_and_task in services_and_tasks:
-            service, task = service_and_task
 
-            node_id = task.get("NodeID", None)
-            if not node_id:
-                continue
+def get_task_rows(services, depth=None):
+    """
+    get the tasks of the services, newest first and without finished shutdowns
 
-            node = next((n for n in nodes if n.id == node_id), None)
+    running tasks are always returned; of the shutdown history only the
+    newest depth tasks are kept, selected with a heap instead of sorting
+    all of them
+    """
+    depth = get_task_history_depth() if depth is None else depth
 
-            state = task["Status"].get("State")
-            desired_state = task.get("DesiredState", "unknown")
+    service_names = {s.id: s.name for s in services}
 
-            if state == desired_state and state == "shutdown":
-                continue
+    nodes, current_tasks, history_tasks = aio.gather(
+        records.get_nodes,
+        lambda: records.get_tasks(filters={
+            "service": list(service_names),
+            "desired-state": ["running", "accepted"]}),
+        lambda: records.get_tasks(filters={
+            "service": list(service_names),
+            "desired-state": "shutdown"}))
 
-            tag = task["Spec"]["ContainerSpec"]["Image"].split(":", 1)[1]
-            tag = tag.split("@", 1)[0]
+    node_names = {n.id: n.hostname for n in nodes}
+    history_tasks = (t for t in history_tasks if t.state != "shutdown")
 
-            color = "green" if state == desired_state else "red"
+    def get_updated_at(task):
+        return task.updated_at
 
-            table.add_row(
-                utils.format_date_time(task["UpdatedAt"]),
-                node.attrs.get("Description").get("Hostname"),
-                service.name,
-                tag,
-                f"[{color}]{state}[/]",
-                desired_state,
-                task["Status"].get("Err"))
+    tasks = heapq.merge(
+        sorted(current_tasks, key=get_updated_at, reverse=True),
+        heapq.nlargest(depth, history_tasks, key=get_updated_at),
+        key=get_updated_at,
+        reverse=True)
+
+    for task in tasks:
+        if not task.node_id:
+            continue
+
+        tag = task.image.split(":", 1)[1]
+        tag = tag.split("@", 1)[0]
 
-            index += 1
-            if index > 40:
-                break
+        yield {
+            "updated_at": task.updated_at,
+            "node": node_names.get(task.node_id, task.node_id),
+            "service": service_names.get(task.service_id),
+            "tag": tag,
+            "state": task.state,
+            "desired_state": task.desired_state,
+            "error": task.error}
 
-        return table
 
-    RefreshUntilKeyPressed(console, __show_header, go)
+def get_task_history_depth():
+    """get the number of finished tasks shown, set by DCLI_TASK_HISTORY"""
+    depth = os.getenv("DCLI_TASK_HISTORY", "40")
+    return int(depth) if depth.isdigit() else 40
 
 
 def cmd_update():
@@ -337,4 +486,4 @@ def cmd_update():
 
         console.print(f"  service [orange3]{service.name}[/] updated")
 
-    cmd_tasks(services)
+    rollout.monitor(console, services)
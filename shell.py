@@ -0,0 +1,218 @@
+import inspect
+from prompt_toolkit.application import Application
+from prompt_toolkit.data_structures import Point
+from prompt_toolkit.key_binding import KeyBindings
+from prompt_toolkit.layout import HSplit, Layout, VSplit, Window
+from prompt_toolkit.layout.controls import FormattedTextControl
+from prompt_toolkit.layout.dimension import Dimension
+from prompt_toolkit.styles import Style
+from questionary.prompts.common import InquirerControl
+from command import Command
+from command_handler import CommandHandler
+import utils
+
+# the shortcuts of the classic menus
+SHORTCUT_KEYS = InquirerControl.SHORTCUT_KEYS
+
+STYLE = Style.from_dict({
+    "header": "bg:#262626 #ff8700 bold",
+    "hint": "#8a8a8a",
+    "selected": "bg:#ffffff #ff0000",
+    "shortcut": "#ff8700",
+    "title": "#ff8700 bold",
+    "separator": "#444444",
+    "help": "bg:#262626 #bcbcbc",
+})
+
+HELP = [
+    ("class:shortcut", " ↑/↓"), ("", " select  "),
+    ("class:shortcut", "Enter/→"), ("", " open or run  "),
+    ("class:shortcut", "Esc/←"), ("", " back  "),
+    ("class:shortcut", "1-9 a-z"), ("", " shortcut  "),
+    ("class:shortcut", "Ctrl+C"), ("", " exit"),
+]
+
+
+class Shell:
+    """
+    Full-screen application showing the menus
+
+    the open menus are kept on a stack, the commands of the top one
+    are listed next to the details of the selected one; menus are
+    opened and left within the application, which only redraws what
+    changed. A command runs after the application left the screen, on
+    the main thread like in the classic menus, so ctrl+c and the
+    prompts of the command work as before; the application comes back
+    with the same menu and selection afterwards
+    """
+
+    def __init__(self, handler: CommandHandler):
+        self.stack = [[handler, 0]]
+        self.menus = {}
+        self.app = Application(
+            layout=self.__get_layout(),
+            key_bindings=self.__get_key_bindings(),
+            style=STYLE,
+            full_screen=True)
+
+        # escape leaves a menu, it must not wait for a following key
+        self.app.ttimeoutlen = 0.05
+
+    def run(self):
+        """show the menus until the main menu is left"""
+        while True:
+            command = self.app.run()
+            if command is None:
+                return
+
+            try:
+                leave = self.__get_handler().run_command(command.name)
+            except KeyboardInterrupt:
+                leave = False
+
+            if leave:
+                if len(self.stack) == 1:
+                    return
+
+                self.stack.pop()
+
+    def __get_handler(self) -> CommandHandler:
+        return self.stack[-1][0]
+
+    def __get_selected(self) -> Command:
+        handler, index = self.stack[-1]
+        return handler.get_commands()[index]
+
+    def __get_menu(self, command: Command) -> CommandHandler:
+        """load the handler of a sub menu once"""
+        if command not in self.menus:
+            self.menus[command] = command.menu()
+
+        return self.menus[command]
+
+    def __move(self, offset):
+        count = len(self.__get_handler().get_commands())
+        self.stack[-1][1] = max(0, min(self.stack[-1][1] + offset, count - 1))
+
+    def __open(self, app):
+        """open the selected menu or leave the application to run the selected command"""
+        command = self.__get_selected()
+
+        if command.back:
+            self.__back(app)
+        elif command.menu:
+            self.stack.append([self.__get_menu(command), 0])
+        else:
+            app.exit(result=command)
+
+    def __back(self, app):
+        if len(self.stack) == 1:
+            app.exit()
+        else:
+            self.stack.pop()
+
+    def __get_key_bindings(self):
+        bindings = KeyBindings()
+
+        @bindings.add("up")
+        def _(event):
+            self.__move(-1)
+
+        @bindings.add("down")
+        def _(event):
+            self.__move(1)
+
+        @bindings.add("pageup")
+        @bindings.add("home")
+        def _(event):
+            self.stack[-1][1] = 0
+
+        @bindings.add("pagedown")
+        @bindings.add("end")
+        def _(event):
+            self.stack[-1][1] = len(self.__get_handler().get_commands()) - 1
+
+        @bindings.add("enter")
+        @bindings.add("right")
+        def _(event):
+            self.__open(event.app)
+
+        @bindings.add("escape")
+        @bindings.add("left")
+        @bindings.add("backspace")
+        def _(event):
+            self.__back(event.app)
+
+        @bindings.add("c-c")
+        @bindings.add("c-d")
+        def _(event):
+            event.app.exit()
+
+        for index, key in enumerate(SHORTCUT_KEYS):
+            @bindings.add(key)
+            def _(event, index=index):
+                if index < len(self.__get_handler().get_commands()):
+                    self.stack[-1][1] = index
+                    self.__open(event.app)
+
+        return bindings
+
+    def __get_layout(self):
+        menu = Window(
+            FormattedTextControl(
+                self.__get_menu_text,
+                focusable=True,
+                show_cursor=False,
+                get_cursor_position=lambda: Point(0, self.stack[-1][1])),
+            width=Dimension(min=20, preferred=32, max=40))
+
+        details = Window(FormattedTextControl(self.__get_details_text), wrap_lines=True)
+
+        return Layout(
+            HSplit([
+                Window(FormattedTextControl(self.__get_header_text), height=1, style="class:header"),
+                Window(height=1),
+                VSplit([menu, Window(width=1, char="│", style="class:separator"), details]),
+                Window(FormattedTextControl(HELP), height=1, style="class:help"),
+            ]),
+            focused_element=menu)
+
+    def __get_header_text(self):
+        """the titles of the open menus, with the active endpoint if there are several"""
+        return [("", " " + utils.get_title(" › ".join(handler.title for handler, _ in self.stack)))]
+
+    def __get_menu_text(self):
+        handler, selected = self.stack[-1]
+        fragments = []
+
+        for index, command in enumerate(handler.get_commands()):
+            style = "class:selected" if index == selected else ""
+            key = SHORTCUT_KEYS[index] if index < len(SHORTCUT_KEYS) else " "
+            arrow = " ›" if command.menu else ""
+
+            fragments.append(("class:shortcut" if index != selected else style, f" {key}) "))
+            fragments.append((style, f"{command.name}{arrow}".ljust(30)))
+            fragments.append(("", "\n"))
+
+        return fragments
+
+    def __get_details_text(self):
+        command = self.__get_selected()
+        fragments = [("class:title", f" {command.name}\n\n"), ("", f" {command.description}\n\n")]
+
+        if command.menu and command not in self.menus:
+            # a menu is only loaded when it is opened, not when the cursor passes over it
+            fragments.append(("class:hint", " Enter opens the menu\n"))
+        elif command.menu:
+            for index, sub_command in enumerate(self.menus[command].get_commands()):
+                key = SHORTCUT_KEYS[index] if index < len(SHORTCUT_KEYS) else " "
+                fragments.append(("class:shortcut", f" {key}) "))
+                fragments.append(("", f"{sub_command.name.ljust(15)}{sub_command.description}\n"))
+        elif not command.back:
+            doc = inspect.getdoc(command.handler)
+            if doc and doc != command.description:
+                fragments.append(("", f" {doc}\n\n"))
+
+            fragments.append(("class:hint", " Enter runs the command, the menu comes back afterwards\n"))
+
+        return fragments
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+
+# seconds a finished response is shared with identical requests
+DEFAULT_WINDOW = 0.5
+
+
+def get_window():
+    """get the seconds a finished response is shared, set by DCLI_COALESCE_WINDOW (0 disables it)"""
+    try:
+        return float(os.getenv("DCLI_COALESCE_WINDOW", DEFAULT_WINDOW))
+    except ValueError:
+        return DEFAULT_WINDOW
+
+
+class Call:
+    """One request, shared by all callers asking for the same while it runs"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs identical calls only once
+
+    callers asking for a key while its call is running wait for that
+    call, and get its result for a short window after it finished;
+    errors are only shared with callers that were already waiting
+    """
+
+    def __init__(self, window: float = None):
+        self.window = get_window() if window is None else window
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func):
+        """get the result of func, shared with identical calls for the key"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None or (call.done.is_set() and (
+                call.error is not None or time.monotonic() - call.finished_at > self.window))
+
+            if leader:
+                call = self.calls[key] = Call()
+
+        if leader:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+            finally:
+                call.finished_at = time.monotonic()
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+
+        return call.result
+
+    def forget(self):
+        """drop all shared results, e.g. after something was changed"""
+        with self.lock:
+            self.calls = {}
+
+
+def install(api, window: float = None):
+    """
+    coalesce the get requests of a docker api client
+
+    streams (logs, events, stats) are not coalesced, and every post,
+    put or delete drops the shared responses, so a list following a
+    change always sees it
+    """
+    window = get_window() if window is None else window
+    if not window > 0:
+        return
+
+    flight = SingleFlight(window)
+    get = api._get
+
+    def coalesced_get(url, **kwargs):
+        if kwargs.get("stream"):
+            return get(url, **kwargs)
+
+        key = (url, json.dumps(kwargs.get("params"), sort_keys=True, default=str))
+        return flight.do(key, lambda: __read(get(url, **kwargs)))
+
+    api._get = coalesced_get
+
+    for name in ("_post", "_put", "_delete"):
+        setattr(api, name, __forgetting(getattr(api, name), flight))
+
+
+def __read(response):
+    """read the body, so the response can be parsed by every caller"""
+    _ = response.content
+    return response
+
+
+def __forgetting(func, flight):
+    def call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            flight.forget()
+
+    return call
@@ -0,0 +1,206 @@
+import json
+from collections import Counter
+from datetime import datetime, timezone
+import docker
+from docker.models.containers import Container
+from docker.models.images import Image
+from docker.models.networks import Network
+from docker.models.nodes import Node
+from docker.models.resource import Collection
+from docker.models.services import Service
+from docker.models.volumes import Volume
+import zstandard
+import aio
+import utils
+
+FORMAT_VERSION = 1
+
+
+def capture(client):
+    """capture services, tasks, nodes, networks, volumes, images and containers in one pass"""
+    services, tasks, nodes, networks, volumes, images, containers = aio.gather(
+        client.services.list,
+        client.api.tasks,
+        client.nodes.list,
+        client.networks.list,
+        client.volumes.list,
+        client.images.list,
+        lambda: client.containers.list(all=True))
+
+    return {
+        "version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "endpoint": client.api.base_url,
+        "services": [s.attrs for s in services],
+        "tasks": tasks,
+        "nodes": [n.attrs for n in nodes],
+        "networks": [n.attrs for n in networks],
+        "volumes": [v.attrs for v in volumes],
+        "images": [i.attrs for i in images],
+        "containers": [c.attrs for c in containers]}
+
+
+def save(state, path):
+    """write the state zstandard compressed, the file is replaced atomically"""
+    data = zstandard.ZstdCompressor(level=10).compress(json.dumps(state).encode("utf-8"))
+    utils.write_atomic(path, data)
+
+
+def load(path):
+    """read a state written by save"""
+    with open(path, "rb") as file:
+        state = json.loads(zstandard.ZstdDecompressor().decompress(file.read()))
+
+    if state.get("version") != FORMAT_VERSION:
+        raise Exception(f"unsupported snapshot version {state.get('version')}")
+
+    return state
+
+
+def get_file_name():
+    """get a default file name for a new snapshot"""
+    return f"dcli-snapshot-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json.zst"
+
+
+def is_snapshot(client):
+    """check whether the client reads from a snapshot instead of a daemon"""
+    return getattr(client, "snapshot", None) is not None
+
+
+class SnapshotClient:
+    """
+    Read-only replacement for docker.DockerClient backed by a snapshot
+
+    it returns the models of the docker sdk, so the views work
+    unchanged; everything that would modify the swarm fails
+    """
+
+    def __init__(self, state, path=None):
+        self.state = state
+        self.snapshot = path or "memory"
+        self.api = SnapshotAPI(state, self.snapshot)
+
+        self.services = SnapshotCollection(self, Service, state["services"], lambda a: a["Spec"]["Name"])
+        self.nodes = SnapshotCollection(self, Node, state["nodes"], lambda a: a["Description"]["Hostname"])
+        self.networks = SnapshotCollection(self, Network, state["networks"], lambda a: a["Name"])
+        self.volumes = SnapshotCollection(self, Volume, state["volumes"], lambda a: a["Name"])
+        self.images = SnapshotCollection(self, Image, state["images"], lambda a: a.get("RepoTags") or [])
+        self.containers = ContainerSnapshotCollection(
+            self, Container, state["containers"], lambda a: a["Name"].lstrip("/"))
+
+    @classmethod
+    def from_file(cls, path):
+        """create a client for a snapshot file"""
+        return cls(load(path), path)
+
+    def df(self):
+        """get the disk usage as far as the snapshot knows it, shared sizes are unknown"""
+        containers = self.state["containers"]
+        usage = Counter(c.get("Image") for c in containers)
+
+        return {
+            "LayersSize": None,
+            "Images": [dict(i, SharedSize=-1, Containers=usage[i["Id"]]) for i in self.state["images"]],
+            "Containers": containers,
+            "Volumes": self.state["volumes"],
+            "BuildCache": []}
+
+    def __getattr__(self, name):
+        # read from __dict__, a copy made without __init__ would recurse otherwise
+        raise AttributeError(f"'{name}' is not available on the snapshot {self.__dict__.get('snapshot')}")
+
+
+class SnapshotAPI:
+    """Low level api calls the views need, answered from the snapshot"""
+
+    def __init__(self, state, name):
+        self.state = state
+        self.base_url = f"snapshot://{name}"
+
+    def tasks(self, filters=None):
+        """get the tasks matching the filters like the swarm api does"""
+        filters = filters or {}
+        tasks = self.state["tasks"]
+
+        if "service" in filters:
+            wanted = set(as_list(filters["service"]))
+            ids = {s["ID"] for s in self.state["services"] if s["ID"] in wanted or s["Spec"]["Name"] in wanted}
+            tasks = [t for t in tasks if t.get("ServiceID") in ids]
+
+        for key, attr in (("desired-state", "DesiredState"), ("node", "NodeID"), ("id", "ID")):
+            if key in filters:
+                wanted = set(as_list(filters[key]))
+                tasks = [t for t in tasks if t.get(attr) in wanted]
+
+        return tasks
+
+    def services(self, filters=None):
+        """get the services matching the id and name filters"""
+        return self.__filter(self.state["services"], filters, lambda s: s["Spec"]["Name"])
+
+    def nodes(self, filters=None):
+        """get the nodes matching the id and name filters"""
+        return self.__filter(self.state["nodes"], filters, lambda n: n["Description"]["Hostname"])
+
+    def __getattr__(self, name):
+        raise AttributeError(f"'{name}' is not available on a snapshot")
+
+    @staticmethod
+    def __filter(items, filters, get_name):
+        filters = filters or {}
+
+        if "id" in filters:
+            wanted = set(as_list(filters["id"]))
+            items = [i for i in items if i["ID"] in wanted]
+        if "name" in filters:
+            wanted = set(as_list(filters["name"]))
+            items = [i for i in items if get_name(i) in wanted]
+
+        return items
+
+
+def as_list(value):
+    """get a filter value as list, the api accepts a single value or a list"""
+    return [value] if isinstance(value, str) else list(value)
+
+
+class SnapshotCollection(Collection):
+    """Collection of docker sdk models created from the attrs of a snapshot"""
+
+    def __init__(self, client, model, items, get_names):
+        super().__init__(client=client)
+        self.model = model
+        self.items = items
+        self.get_names = get_names
+
+    def list(self, *args, **kwargs):
+        """get all models"""
+        return [self.prepare_model(attrs) for attrs in self.items]
+
+    def get(self, key, *args, **kwargs):
+        """get a model by id, id prefix or name"""
+        for attrs in self.items:
+            model = self.prepare_model(attrs)
+            names = self.get_names(attrs)
+            names = names if isinstance(names, list) else [names]
+
+            if key in names or model.id == key or model.id.startswith(key):
+                return model
+
+        raise docker.errors.NotFound(f"{key} not found in snapshot")
+
+
+class ContainerSnapshotCollection(SnapshotCollection):
+    """Containers of a snapshot, supporting the status filter and all flag of the daemon"""
+
+    def list(self, *args, all=False, filters=None, **kwargs):  # pylint: disable=redefined-builtin
+        """get the containers matching the filters"""
+        containers = super().list()
+        status = (filters or {}).get("status")
+
+        if status:
+            return [c for c in containers if c.status in as_list(status)]
+        if not all:
+            return [c for c in containers if c.status == "running"]
+
+        return containers
@@ -16,34 +16,52 @@ class Command:
     status: str = None
 
 
-def execute_command(host, commands: list[Command]):
-    """Call SSH command on remote host and return stdout as string"""
+def get_connect_kwargs():
+    """
+    get the user and the paramiko connect arguments from SSH_USER,
+    SSH_KEY_FILE, SSH_KEY_PASSWORD and SSH_PWD
+
+    raises an exception if the user or the key file is missing
+    """
     key_file = os.getenv("SSH_KEY_FILE")
     key_password = os.getenv("SSH_KEY_PASSWORD")
     user = os.getenv("SSH_USER")
     pwd = os.getenv("SSH_PWD")
 
     if not key_file or not user:
-        return "no key or no user"
+        raise Exception("no key or no user")
 
     if not os.path.exists(key_file):
-        return "key file does not exist"
+        raise Exception("key file does not exist")
     if not os.path.isfile(key_file):
-        return "key file is not a file"
+        raise Exception("key file is not a file")
 
     connect_kwargs = {
         "auth_timeout": 3,
         "timeout": 3,
+        "key_filename": key_file,
     }
 
-    if key_file:
-        connect_kwargs["key_filename"] = key_file
     if key_password:
         connect_kwargs["passphrase"] = key_password
     if pwd:
         connect_kwargs["password"] = pwd
+
+    return user, connect_kwargs
+
+
+def execute_command(host, commands: list[Command]):
+    """Call SSH command on remote host and return stdout as string"""
+    try:
+        user, connect_kwargs = get_connect_kwargs()
+    except Exception as e:
+        return str(e)
+
+    if os.getenv("SSH_PWD"):
         connect_kwargs["sudo"] = {"password": "pwd"}
 
+    client = None
+
     try:
         client = fabric.Connection( host=host, user=user, connect_kwargs=connect_kwargs)
 
@@ -1,31 +1,59 @@
+from collections import Counter
 from rich.console import Console
-import docker
+from rich.table import Table
 import questionary
 from command_handler import CommandHandler
+import aio
+import connections
+import diff
+import image
+import snapshot
 import utils
+import volume
 
 console = Console()
-client = docker.from_env()
+client = connections.client
 
 
 def start():
     """initial menu"""
+    return get_handler().start()
 
-    while True:
-        __show_header()
 
-        handler = CommandHandler()
-        handler.add_command("back", "go back", lambda: True)
-        handler.add_command("info", "show system info", cmd_info)
-        handler.add_command("prune", "prune all unused resources", cmd_prune)
-        handler.add_command("version", "show version info", cmd_version)
+def get_handler():
+    """get the commands of the menu"""
+    handler = CommandHandler("system")
+    handler.add_back()
+    handler.add_command("diff", "show changes since a snapshot", cmd_diff)
+    handler.add_command("info", "show system info", cmd_info)
+    handler.add_command("prune", "prune all unused resources", cmd_prune)
+    handler.add_command("snapshot", "save a snapshot of the swarm state", cmd_snapshot)
+    handler.add_command("version", "show version info", cmd_version)
 
-        if handler.show_command_chooser():
-            return False
+    return handler
 
 
-def __show_header():
-    utils.header("system")
+def cmd_diff():
+    """show changes since a snapshot"""
+    old_path = questionary.path("enter the snapshot file of the old state").ask()
+    if not old_path:
+        return
+
+    new_path = questionary.path("enter the snapshot file of the new state, empty for live").ask()
+    if new_path is None:
+        return
+
+    with console.status("comparing swarm state..."):
+        old = snapshot.load(old_path)
+        new = snapshot.load(new_path) if new_path else snapshot.capture(client)
+        changes = list(diff.compare(old, new))
+
+    if changes:
+        console.print(diff.get_table(changes))
+    else:
+        console.print("no changes")
+
+    questionary.press_any_key_to_continue("press any key to continue").ask()
 
 
 def cmd_info():
@@ -37,18 +65,92 @@ def cmd_info():
 
 def cmd_prune():
     """prune all unused resources"""
+    with console.status("calculating disk usage..."):
+        estimate = get_prune_estimate(client.df())
+
+    console.print(__get_prune_table("estimate", estimate))
     answer = questionary.confirm("are you sure you want to prune all unused resources?").ask()
     if not answer:
         return
 
-    with console.status("pruning containers..."):
-        client.containers.prune()
-    with console.status("pruning networks..."):
-        client.networks.prune()
-    with console.status("pruning volumes..."):
-        client.volumes.prune()
-    with console.status("pruning images..."):
-        client.images.prune()
+    with console.status("pruning resources..."):
+        result = prune()
+
+    console.print(__get_prune_table("reclaimed", result))
+    questionary.press_any_key_to_continue("press any key to continue").ask()
+
+
+def prune():
+    """
+    prune all unused resources, get the number of deleted items and reclaimed bytes per type
+
+    containers are pruned first, as they keep networks, volumes and
+    images in use; networks and volumes are independent of each other
+    and pruned concurrently, images last
+    """
+    containers = client.containers.prune()
+    networks, volumes = aio.gather(client.networks.prune, client.volumes.prune)
+    images = client.images.prune()
+
+    return {
+        "containers": (len(containers.get("ContainersDeleted") or []), containers.get("SpaceReclaimed") or 0),
+        "networks": (len(networks.get("NetworksDeleted") or []), None),
+        "volumes": (len(volumes.get("VolumesDeleted") or []), volumes.get("SpaceReclaimed") or 0),
+        "images": (len(images.get("ImagesDeleted") or []), images.get("SpaceReclaimed") or 0)}
+
+
+def get_prune_estimate(usage):
+    """
+    estimate the number of items and bytes prune frees per type, from the disk usage
+
+    stopped containers are counted as already removed, so the volumes
+    and images only they use are included; networks are not part of
+    the disk usage
+    """
+    stopped = [c for c in usage.get("Containers") or [] if c.get("State") != "running"]
+    running = [c for c in usage.get("Containers") or [] if c.get("State") == "running"]
+    running_images = Counter(c.get("ImageID") for c in running)
+
+    volumes = volume.get_prune_estimate(list(volume.get_rows(dict(usage, Containers=running))))
+    images = image.get_prune_estimate(dict(usage, Images=[
+        dict(i, Containers=running_images[i["Id"]]) for i in usage.get("Images") or []]))
+
+    return {
+        "containers": (len(stopped), sum(c.get("SizeRw") or 0 for c in stopped)),
+        "networks": (None, None),
+        "volumes": volumes,
+        "images": images}
+
+
+def __get_prune_table(title, result):
+    table = Table(title=title)
+    table.add_column("type")
+    table.add_column("items", justify="right")
+    table.add_column("size", justify="right")
+
+    for kind, (count, size) in result.items():
+        table.add_row(kind, "" if count is None else str(count), utils.format_size(size))
+
+    table.add_row(
+        "[bold]total[/]",
+        "",
+        f"[bold]{utils.format_size(sum(size or 0 for _, size in result.values()))}[/]")
+
+    return table
+
+
+def cmd_snapshot():
+    """save a snapshot of the swarm state"""
+    path = questionary.text("enter the file name", default=snapshot.get_file_name()).ask()
+    if not path:
+        return
+
+    with console.status("capturing swarm state..."):
+        snapshot.save(snapshot.capture(client), path)
+
+    console.print(f"snapshot saved to [orange3]{path}[/]")
+    questionary.press_any_key_to_continue("press any key to continue").ask()
+
 
 def cmd_version():
     """show version info"""
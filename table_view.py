@@ -0,0 +1,359 @@
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Callable, Iterable
+from rich.console import Console, Group
+from rich.live import Live
+from rich.markup import escape
+from rich.table import Table
+from rich.text import Text
+import cache
+import connections
+import ratelimit
+import terminal
+import utils
+
+HELP = "[orange3]↑↓ PgUp PgDn[/] scroll  [orange3]←→[/] sort column  [orange3]r[/] reverse  " \
+       "[orange3]/[/] search  [orange3]s[/] pause refresh  [orange3]q/Enter[/] exit"
+
+
+class RowStore:
+    """
+    Compact store of all rows of a view
+
+    rows are kept as tuples of raw values, the keys are taken from
+    the first row; sorting and searching only produce a list of row
+    indexes, the cells are formatted for the visible rows only
+    """
+
+    keys: list[str]
+    rows: list[tuple]
+    indexes: list[int]
+
+    def __init__(self):
+        self.keys = []
+        self.rows = []
+        self.indexes = []
+        self.sort_key = None
+        self.sort_reverse = False
+        self.query = ""
+
+    def set_rows(self, rows: Iterable[dict]):
+        """replace all rows, the dicts are reduced to tuples"""
+        rows = iter(rows)
+        first = next(rows, None)
+
+        if first is None:
+            self.rows = []
+        else:
+            self.keys = list(first)
+            self.rows = [tuple(first.values())]
+            self.rows.extend(tuple(row.get(k) for k in self.keys) for row in rows)
+
+        self.update()
+
+    def get_row(self, position: int) -> dict:
+        """get the row at a position of the sorted and filtered view"""
+        return dict(zip(self.keys, self.rows[self.indexes[position]]))
+
+    def update(self):
+        """recalculate the sorted and filtered row indexes"""
+        indexes = range(len(self.rows))
+
+        if self.query:
+            query = self.query.lower()
+            indexes = [i for i in indexes if query in self.__get_search_text(self.rows[i])]
+
+        if self.sort_key in self.keys:
+            column = self.keys.index(self.sort_key)
+            indexes = sorted(
+                indexes,
+                key=lambda i: self.__get_sort_value(self.rows[i][column]),
+                reverse=self.sort_reverse)
+
+        self.indexes = list(indexes)
+
+    @staticmethod
+    def __get_search_text(row):
+        return " ".join(RowStore.__get_text(v) for v in row).lower()
+
+    @staticmethod
+    def __get_sort_value(value):
+        if value is None:
+            return (0, 0, "")
+        if isinstance(value, (int, float)):
+            return (1, value, "")
+
+        return (2, 0, RowStore.__get_text(value).lower())
+
+    @staticmethod
+    def __get_text(value):
+        if value is None:
+            return ""
+        if isinstance(value, (list, tuple)):
+            return " ".join(str(v) for v in value)
+
+        return str(value)
+
+
+class TableView:
+    """
+    Scrollable table showing only the rows fitting on the screen
+
+    the rows are reloaded every second in the background until the
+    view is closed; the visible slice can be scrolled, sorted by any
+    column and filtered with an incremental search
+
+    with a cache key, the rows of the last session are shown as stale
+    until the first load finished, and the latest rows are saved
+    """
+
+    def __init__(
+            self,
+            console: Console,
+            title: str,
+            columns: list[tuple[str, str]],
+            load_rows: Callable[[], Iterable[dict]],
+            format_row: Callable[[dict], list[str]],
+            refresh: bool = True,
+            cache_key: str = None):
+        """
+        columns is a list of (title, key) tuples, load_rows returns the
+        rows as dicts and format_row turns one of them into the cells
+        """
+        self.console = console
+        self.title = title
+        self.columns = columns
+        self.load_rows = load_rows
+        self.format_row = format_row
+        self.refresh = refresh
+        self.store = RowStore()
+        self.sort_column = None
+        self.lock = Lock()
+        self.event = Event()
+        self.changed = Event()
+        self.offset = 0
+        self.search_mode = False
+        self.error = None
+        self.cache_key = cache_key
+        self.stale_since = None
+
+    def show(self):
+        """show the view until it is closed by the user"""
+        if not terminal.is_interactive():
+            self.__load()
+            self.__print()
+            return
+
+        cached = cache.load(self.cache_key) if self.cache_key else None
+
+        if cached:
+            rows, self.stale_since = cached
+            self.store.set_rows(rows)
+        else:
+            self.__load()
+
+        thread = Thread(target=self.__run_refresh, daemon=True)
+        thread.start()
+
+        try:
+            with terminal.raw_mode(), Live(console=self.console, screen=True, auto_refresh=False) as live:
+                live.update(self.__render(), refresh=True)
+
+                while True:
+                    key = terminal.read_key(timeout=0.2)
+
+                    if key is not None and not self.__handle_key(key):
+                        break
+
+                    if key is not None or self.changed.is_set():
+                        self.changed.clear()
+                        live.update(self.__render(), refresh=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.event.set()
+
+            with self.lock:
+                self.__save()
+
+    def __run_refresh(self):
+        with ratelimit.background():
+            if self.stale_since:
+                self.__load()
+                self.changed.set()
+
+            while not self.event.wait(self.__get_refresh_interval()):
+                if self.refresh:
+                    self.__load()
+                    self.changed.set()
+
+    @staticmethod
+    def __get_refresh_interval():
+        """one second, longer if the manager is slow or the requests are throttled"""
+        limiter = ratelimit.get(connections.get_active())
+        return limiter.get_slowdown() if limiter else 1
+
+    def __load(self):
+        try:
+            rows = list(self.load_rows())
+            error = None
+        except Exception as e:
+            rows = None
+            error = str(e)
+
+        with self.lock:
+            self.error = error
+
+            if rows is not None:
+                self.store.set_rows(rows)
+
+                if self.stale_since:
+                    self.stale_since = None
+                    self.__save()
+
+    def __save(self):
+        """save the rows as last known state of the view, unless they are stale"""
+        if not self.cache_key or self.stale_since or not self.store.rows:
+            return
+
+        keys = self.store.keys
+        cache.save(self.cache_key, [dict(zip(keys, row)) for row in self.store.rows])
+
+    def __handle_key(self, key):
+        """handle a key, return False to close the view"""
+        with self.lock:
+            if self.search_mode:
+                self.__handle_search_key(key)
+                return True
+
+            page = max(self.__get_visible_height() - 1, 1)
+            last = max(len(self.store.indexes) - 1, 0)
+
+            if key in ("q", "enter", "escape"):
+                return False
+            elif key in ("down", "j"):
+                self.offset += 1
+            elif key in ("up", "k"):
+                self.offset -= 1
+            elif key in ("pagedown", " "):
+                self.offset += page
+            elif key == "pageup":
+                self.offset -= page
+            elif key in ("home", "g"):
+                self.offset = 0
+            elif key in ("end", "G"):
+                self.offset = last
+            elif key in ("right", "left"):
+                self.__change_sort_column(1 if key == "right" else -1)
+            elif key == "r":
+                self.store.sort_reverse = not self.store.sort_reverse
+                self.store.update()
+            elif key == "/":
+                self.search_mode = True
+            elif key == "s":
+                self.refresh = not self.refresh
+
+            self.offset = min(max(self.offset, 0), last)
+            return True
+
+    def __handle_search_key(self, key):
+        if key == "enter":
+            self.search_mode = False
+            return
+        elif key == "escape":
+            self.search_mode = False
+            self.store.query = ""
+        elif key == "backspace":
+            self.store.query = self.store.query[:-1]
+        elif key.isprintable() and key not in terminal.KEYS.values():
+            self.store.query += key
+        else:
+            return
+
+        self.offset = 0
+        self.store.update()
+
+    def __change_sort_column(self, step):
+        column = self.sort_column
+
+        if column is None:
+            column = 0 if step > 0 else len(self.columns) - 1
+        else:
+            column += step
+
+        self.sort_column = column if 0 <= column < len(self.columns) else None
+        self.store.sort_key = self.columns[self.sort_column][1] if self.sort_column is not None else None
+        self.store.update()
+
+    def __get_header(self, status=""):
+        return Group(
+            utils.get_header(self.title),
+            Text.from_markup(HELP),
+            Text.from_markup(status))
+
+    def __get_visible_height(self):
+        """get the number of lines available for table rows"""
+        header_height = len(self.console.render_lines(self.__get_header(), pad=False))
+
+        # table header, its separator and the bottom border
+        return max(self.console.size.height - header_height - 4, 1)
+
+    def __print(self):
+        """print all rows without height limit, for output that is not a terminal"""
+        if self.error:
+            self.console.print(f"[red]{escape(self.error)}[/]")
+
+        table = Table(expand=True)
+        for title, _ in self.columns:
+            table.add_column(title)
+
+        for position in range(len(self.store.indexes)):
+            table.add_row(*self.format_row(self.store.get_row(position)))
+
+        self.console.print(table)
+
+    def __render(self):
+        with self.lock:
+            height = self.__get_visible_height()
+            indexes = self.store.indexes
+
+            table = Table(expand=True)
+            for position, (title, _) in enumerate(self.columns):
+                if position == self.sort_column:
+                    title = f"{title} {'▼' if self.store.sort_reverse else '▲'}"
+
+                table.add_column(title, no_wrap=True, overflow="ellipsis")
+
+            used = 0
+            position = self.offset
+            while position < len(indexes) and used < height:
+                cells = self.format_row(self.store.get_row(position))
+                row_height = max(str(c).count("\n") + 1 for c in cells)
+
+                if used > 0 and used + row_height > height:
+                    break
+
+                table.add_row(*cells)
+                used += row_height
+                position += 1
+
+            status = f"rows {min(self.offset + 1, len(indexes))}-{position} of {len(indexes)}"
+            if self.stale_since:
+                saved_at = datetime.fromtimestamp(self.stale_since).strftime("%d.%m.%Y %H:%M:%S")
+                status += f"  [red]stale, from {saved_at}, loading...[/]"
+            if len(indexes) != len(self.store.rows):
+                status += f" (total {len(self.store.rows)})"
+            if self.search_mode or self.store.query:
+                status += f"  search: [orange3]{escape(self.store.query)}[/]{'▏' if self.search_mode else ''}"
+            if not self.refresh:
+                status += "  [red]refresh paused[/]"
+            elif (interval := self.__get_refresh_interval()) > 1:
+                status += f"  [orange3]refresh every {interval:.1f}s[/]"
+
+            limiter = ratelimit.get(connections.get_active())
+            if limiter and limiter.is_throttled():
+                status += "  [red]throttled[/]"
+            if self.error:
+                status += f"  [red]{escape(self.error)}[/]"
+
+            return Group(self.__get_header(status), table)
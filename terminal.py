@@ -0,0 +1,108 @@
+import os
+import re
+import select
+import sys
+import termios
+import tty
+from collections import deque
+from contextlib import contextmanager
+
+KEYS = {
+    "\x1b[A": "up",
+    "\x1b[B": "down",
+    "\x1b[C": "right",
+    "\x1b[D": "left",
+    "\x1bOA": "up",
+    "\x1bOB": "down",
+    "\x1bOC": "right",
+    "\x1bOD": "left",
+    "\x1b[5~": "pageup",
+    "\x1b[6~": "pagedown",
+    "\x1b[H": "home",
+    "\x1b[F": "end",
+    "\x1bOH": "home",
+    "\x1bOF": "end",
+    "\x1b[1~": "home",
+    "\x1b[4~": "end",
+    "\r": "enter",
+    "\n": "enter",
+    "\x7f": "backspace",
+    "\x08": "backspace",
+    "\x1b": "escape",
+    "\t": "tab",
+}
+
+
+# escape sequences of keys missing in KEYS, so they are skipped as a whole
+ESCAPE_SEQUENCE = re.compile(r"\x1b(\[[0-9;]*[~A-Za-z]|O.)?")
+
+__pending = deque()
+
+
+def is_interactive():
+    """check whether stdin and stdout are a terminal"""
+    return sys.stdin.isatty() and sys.stdout.isatty()
+
+
+@contextmanager
+def raw_mode(raw=False):
+    """
+    switch stdin to cbreak mode, or to raw mode if raw is set
+
+    in cbreak mode ctrl+c still raises a KeyboardInterrupt, in raw
+    mode every key including ctrl+c is passed through
+    """
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+
+    try:
+        if raw:
+            tty.setraw(fd)
+        else:
+            tty.setcbreak(fd)
+
+        yield fd
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+        # keys read after the last one that was handled belong to no one
+        __pending.clear()
+
+
+def read_key(timeout=None):
+    """
+    read a key from stdin, must be called in raw_mode
+
+    known escape sequences are returned by name (up, pageup, enter...),
+    everything else as the typed text; None if the timeout expired
+    """
+    if __pending:
+        return __pending.popleft()
+
+    fd = sys.stdin.fileno()
+    readable, _, _ = select.select([fd], [], [], timeout)
+
+    if not readable:
+        return None
+
+    # held or quickly typed keys arrive in one read, the following ones are queued
+    data = os.read(fd, 32).decode("utf-8", errors="ignore")
+    __pending.extend(split_keys(data))
+
+    return __pending.popleft() if __pending else None
+
+
+def split_keys(data):
+    """split the text read from stdin into keys, named like read_key returns them"""
+    keys = []
+    position = 0
+
+    while position < len(data):
+        match = ESCAPE_SEQUENCE.match(data, position) if data[position] == "\x1b" else None
+        end = match.end() if match else position + 1
+
+        key = data[position:end]
+        keys.append(KEYS.get(key, key))
+        position = end
+
+    return keys
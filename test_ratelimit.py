@@ -0,0 +1,55 @@
+import os
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+import ratelimit
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_small_burst(self):
+        """background requests get a token with a burst of one"""
+        limiter = ratelimit.RateLimiter(100, 1)
+
+        for _ in range(3):
+            self.__assert_acquires(limiter, background=True)
+            self.__assert_acquires(limiter, background=False)
+
+    def test_low_rate(self):
+        """a rate below 0.5 still allows a burst of one request"""
+        limiter = ratelimit.RateLimiter(0.2, int(0.2 * 2))
+
+        self.assertEqual(limiter.burst, 1)
+        self.__assert_acquires(limiter, background=False)
+
+    def test_invalid_rate(self):
+        for rate in (0, -1):
+            with self.assertRaises(ValueError):
+                ratelimit.RateLimiter(rate, 10)
+
+    def test_invalid_settings(self):
+        """invalid values fall back to the defaults, a rate of 0 or less disables the limiter"""
+        with mock.patch.dict(os.environ, {"DCLI_RATE_LIMIT": "fast", "DCLI_RATE_BURST": "many"}):
+            ratelimit.install(SimpleNamespace(request=None), "invalid")
+
+        limiter = ratelimit.get("invalid")
+        self.assertEqual(limiter.rate, ratelimit.DEFAULT_RATE)
+        self.assertEqual(limiter.burst, ratelimit.DEFAULT_RATE * 2)
+
+        for rate in ("0", "-5"):
+            with mock.patch.dict(os.environ, {"DCLI_RATE_LIMIT": rate}):
+                ratelimit.install(SimpleNamespace(request=None), f"disabled {rate}")
+
+            self.assertIsNone(ratelimit.get(f"disabled {rate}"))
+
+    def __assert_acquires(self, limiter, background):
+        thread = threading.Thread(target=limiter.acquire, args=(background,), daemon=True)
+        thread.start()
+        thread.join(timeout=1)
+
+        self.assertFalse(thread.is_alive(), "acquire blocked")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
-from os import system
+import functools
+import os
+import tempfile
+from datetime import datetime
 from rich.console import Console
 from rich.markdown import Markdown
+from rich.styled import Styled
 import dateutil.parser
+import connections
 
 console = Console()
 
@@ -9,16 +14,76 @@ console = Console()
 def header(text):
     """print a header"""
     clear()
-    markdown = Markdown(f"# {text}")
-    console.print(markdown, style="orange3 on grey15")
+    console.print(get_header(text))
     console.print()
 
 
+def get_header(text):
+    """get the renderable of a header, with the active endpoint if there are several"""
+    return Styled(Markdown(f"# {get_title(text)}"), "orange3 on grey15")
+
+
+def get_title(text):
+    """get a title with the active endpoint if there are several"""
+    if len(connections.get_endpoints()) > 1:
+        return f"{text} @ {connections.get_active()}"
+
+    return text
+
+
 def clear():
-    """clear the screen"""
-    system("clear")
+    """clear the screen with escape codes, without starting a process"""
+    console.clear()
 
 
+@functools.lru_cache(maxsize=16384)
+def parse_date_time(dt):
+    """
+    parse a datetime string, cached as the same timestamps come with every refresh
+
+    the rfc 3339 timestamps of docker (with up to nanoseconds) are
+    read by datetime itself, other formats by dateutil
+    """
+    try:
+        return datetime.fromisoformat(dt)
+    except ValueError:
+        return dateutil.parser.parse(dt)
+
+
+@functools.lru_cache(maxsize=16384)
 def format_date_time(dt):
     """format a datetime string"""
-    return dateutil.parser.parse(dt).strftime("%d.%m.%Y %H:%M")
+    return parse_date_time(dt).strftime("%d.%m.%Y %H:%M")
+
+
+def parse_timestamp(dt):
+    """get the seconds since the epoch of a datetime string"""
+    return parse_date_time(dt).timestamp()
+
+
+def format_size(size):
+    """format a size in bytes with decimal units like the docker cli, empty if unknown"""
+    if size is None:
+        return ""
+
+    for unit in ("B", "kB", "MB", "GB", "TB"):
+        if abs(size) < 1000 or unit == "TB":
+            break
+        size /= 1000
+
+    return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+
+
+def write_atomic(path, data: bytes):
+    """write a file via a temporary file, so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".dcli-")
+
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -1,30 +1,31 @@
+from collections import Counter
 from rich.console import Console
 from rich.table import Table
-import docker
 import questionary
 from command_handler import CommandHandler
 from refresh import RefreshUntilKeyPressed
+import connections
 import utils
 import styles
 
 console = Console()
-client = docker.from_env()
+client = connections.client
 
 
 def start():
     """initial menu"""
+    return get_handler().start()
 
-    while True:
-        __show_header()
 
-        handler = CommandHandler()
-        handler.add_command("back", "go back", lambda: True)
-        handler.add_command("ls", "list all volumes", cmd_ls)
-        handler.add_command("prune", "prune all unused volumes", cmd_prune)
-        handler.add_command("rm", "remove a volume", cmd_rm)
+def get_handler():
+    """get the commands of the menu"""
+    handler = CommandHandler("volumes")
+    handler.add_back()
+    handler.add_command("ls", "list all volumes", cmd_ls)
+    handler.add_command("prune", "prune all unused volumes", cmd_prune)
+    handler.add_command("rm", "remove a volume", cmd_rm)
 
-        if handler.show_command_chooser():
-            return False
+    return handler
 
 
 def __show_header():
@@ -32,16 +33,27 @@ def __show_header():
 
 
 def __get_table(print_table=True):
+    usage = client.df()
+
     table = Table(expand=True)
     table.add_column("id")
     table.add_column("driver")
     table.add_column("name")
+    table.add_column("size", justify="right")
+    table.add_column("containers", justify="right")
 
-    for volume in sorted(client.volumes.list(), key=lambda c: c.name):
+    rows = list(get_rows(usage))
+    for row in rows:
         table.add_row(
-            volume.short_id,
-            volume.attrs.get("Driver"),
-            volume.name)
+            row["id"],
+            row["driver"],
+            f"[red]{row['name']}[/]" if row["unused"] else row["name"],
+            utils.format_size(row["size"]),
+            str(row["containers"]))
+
+    count, size = get_prune_estimate(rows)
+    table.caption = f"total {utils.format_size(sum(r['size'] or 0 for r in rows))}, " \
+                    f"{count} unused volumes with {utils.format_size(size)}"
 
     if print_table:
         console.print(table)
@@ -49,6 +61,44 @@ def __get_table(print_table=True):
     return table
 
 
+def get_rows(usage=None):
+    """
+    get the rows of the volume table, one dict per volume
+
+    sizes come from the disk usage of the daemon, the containers
+    from the container list of the same response, joined by the
+    volume names of their mounts
+    """
+    usage = usage or client.df()
+    containers = Counter(
+        mount["Name"]
+        for container in usage.get("Containers") or []
+        for mount in container.get("Mounts") or []
+        if mount.get("Type") == "volume")
+
+    for volume in sorted(usage.get("Volumes") or [], key=lambda v: v["Name"]):
+        size = (volume.get("UsageData") or {}).get("Size")
+
+        yield {
+            "id": volume["Name"][:12],
+            "driver": volume.get("Driver"),
+            "name": volume["Name"],
+            "size": None if size is None or size < 0 else size,
+            "containers": containers[volume["Name"]],
+            "unused": containers[volume["Name"]] == 0}
+
+
+def get_prune_estimate(rows):
+    """
+    get the number of unused volumes and their size
+
+    it is an upper bound, daemons with api 1.42 or newer only prune
+    anonymous volumes
+    """
+    unused = [r for r in rows if r["unused"]]
+    return len(unused), sum(r["size"] or 0 for r in unused)
+
+
 def __get_volume_names():
     return [volume.name for volume in client.volumes.list()]
 
@@ -84,12 +134,20 @@ def cmd_ls():
 
 def cmd_prune():
     """prune all unused volumes"""
+    with console.status("calculating disk usage..."):
+        count, size = get_prune_estimate(list(get_rows()))
+
+    console.print(f"prune frees up to [orange3]{utils.format_size(size)}[/] of {count} unused volumes")
     answer = questionary.confirm("are you sure you want to prune all unused volumes?").ask()
     if not answer:
         return
 
     with console.status("pruning volumes..."):
-        client.volumes.prune()
+        result = client.volumes.prune()
+
+    console.print(f"{len(result.get('VolumesDeleted') or [])} volumes deleted, "
+                  f"{utils.format_size(result.get('SpaceReclaimed') or 0)} reclaimed")
+    questionary.press_any_key_to_continue("press any key to continue").ask()
 
 
 def cmd_rm():